@@ -0,0 +1,301 @@
+"""Importación masiva de personas y sus autos desde CSV o NDJSON.
+
+NDJSON: una persona por línea, con sus autos anidados:
+
+    {"nombre": "Ana", "edad": 20, "numeroControl": "21170001", "correo": "ana@example.com",
+     "autos": [{"placa": "ABC-123-A", "marca": "Nissan", "modelo": "Versa", "color": "Rojo"}]}
+
+CSV: una fila por auto con encabezado `nombre,edad,numeroControl,correo,placa,marca,modelo,color`.
+Las filas con el mismo numeroControl son la misma persona; una fila sin placa
+es una persona sin auto.
+
+Las personas se actualizan por `numeroControl` y los autos por placa (su forma
+canónica, `placa_clave`), así que volver a importar el mismo archivo no duplica
+nada. En Postgres las filas se cargan con COPY a tablas temporales y de ahí un
+solo INSERT ... ON CONFLICT por tabla; en SQLite, executemany con el mismo
+upsert. Todo va en una transacción. Las filas con errores (validación, correo
+de otra persona, placa repetida en el archivo) se omiten y se reportan con su
+número de fila.
+
+    cd backend
+    python -m API.modules.bulkImport alumnos.csv --errores errores.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from collections import defaultdict
+
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .config import IMPORT_CHUNK_SIZE
+from .models import Auto, Persona
+from .plateIndex import canonizar_placa
+from .schemas import PersonaImportacion
+
+COLUMNAS_PERSONA = ("nombre", "edad", "numeroControl", "correo")
+COLUMNAS_AUTO = ("placa", "marca", "modelo", "color")
+
+# Las personas nuevas entran como en POST /personas/agregar: autorizadas, sin incidencias y con perfil Usuario.
+_UPSERT_PERSONAS = """
+INSERT INTO personas (nombre, edad, "numeroControl", correo, estatus, "noIncidencias", perfil_id)
+SELECT nombre, edad, "numeroControl", correo, 'Autorizado', 0, 1 FROM _importar_personas
+ON CONFLICT ("numeroControl") DO UPDATE
+SET nombre = EXCLUDED.nombre, edad = EXCLUDED.edad, correo = EXCLUDED.correo
+"""
+
+_UPSERT_AUTOS = """
+INSERT INTO autos (placa, placa_clave, marca, modelo, color, persona_id)
+SELECT a.placa, a.placa_clave, a.marca, a.modelo, a.color, p.id
+FROM _importar_autos a JOIN personas p ON p."numeroControl" = a."numeroControl"
+ON CONFLICT (placa_clave) DO UPDATE
+SET placa = EXCLUDED.placa, marca = EXCLUDED.marca, modelo = EXCLUDED.modelo, color = EXCLUDED.color,
+    persona_id = EXCLUDED.persona_id
+"""
+
+
+def formato_por_nombre(nombre: str | None) -> str:
+    return "csv" if (nombre or "").lower().endswith(".csv") else "ndjson"
+
+
+def leer_filas(archivo, formato: str):
+    """(número de fila, datos, error) por registro de un archivo de texto"""
+    if formato == "csv":
+        # La fila 1 es el encabezado.
+        for fila, registro in enumerate(csv.DictReader(archivo), start=2):
+            datos = {c: (registro.get(c) or "").strip() for c in COLUMNAS_PERSONA}
+            auto = {c: (registro.get(c) or "").strip() for c in COLUMNAS_AUTO}
+            datos["autos"] = [auto] if auto["placa"] else []
+            yield fila, datos, None
+        return
+
+    for fila, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError as e:
+            yield fila, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(datos, dict):
+            yield fila, None, "Se esperaba un objeto JSON por línea"
+            continue
+        yield fila, datos, None
+
+
+def _describir(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+def _bloques(filas: list, tam: int):
+    for i in range(0, len(filas), tam):
+        yield filas[i:i + tam]
+
+
+def _copiar(conn, tabla: str, columnas: tuple[str, ...], filas: list[dict]):
+    """COPY ... FROM STDIN de un bloque de filas (psycopg2)"""
+    buffer = io.StringIO()
+    # QUOTE_ALL para que "" sea texto vacío y no NULL.
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows([fila[c] for c in columnas] for fila in filas)
+    buffer.seek(0)
+    nombres = ", ".join(f'"{c}"' for c in columnas)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {tabla} ({nombres}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+class ImportadorPersonas:
+    """Valida y consolida las filas en memoria y luego las escribe en bloque"""
+
+    def __init__(self, tam_bloque: int = IMPORT_CHUNK_SIZE):
+        self.tam_bloque = tam_bloque
+        self.filas = 0
+        self.errores: list[dict] = []
+        # numeroControl -> columnas de la persona, y las filas del archivo donde aparece.
+        self.personas: dict[str, dict] = {}
+        self._filas_persona: dict[str, list[int]] = defaultdict(list)
+        # correo -> numeroControl, para detectar un correo usado por dos personas.
+        self._correos: dict[str, str] = {}
+        # placa_clave -> (fila, columnas del auto + numeroControl del dueño).
+        self.autos: dict[str, tuple[int, dict]] = {}
+
+    def _error(self, fila: int, mensaje: str):
+        self.errores.append({"fila": fila, "error": mensaje})
+
+    def agregar(self, fila: int, datos: dict | None, error: str | None = None):
+        self.filas += 1
+        if error is not None:
+            self._error(fila, error)
+            return
+        try:
+            persona = PersonaImportacion.model_validate(datos)
+        except ValidationError as e:
+            self._error(fila, _describir(e))
+            return
+
+        control = persona.numeroControl
+        duenio_correo = self._correos.get(persona.correo)
+        if duenio_correo is not None and duenio_correo != control:
+            self._error(fila, f"El correo {persona.correo} ya está en el archivo con numeroControl {duenio_correo}")
+            return
+
+        anterior = self.personas.get(control)
+        if anterior is not None and anterior["correo"] != persona.correo:
+            del self._correos[anterior["correo"]]
+        self._correos[persona.correo] = control
+        self.personas[control] = {
+            "nombre": persona.nombre,
+            "edad": persona.edad,
+            "numeroControl": control,
+            "correo": persona.correo,
+        }
+        self._filas_persona[control].append(fila)
+
+        for auto in persona.autos:
+            clave = canonizar_placa(auto.placa)
+            if not clave:
+                self._error(fila, f"Placa inválida: {auto.placa!r}")
+                continue
+            previo = self.autos.get(clave)
+            if previo is not None and previo[1]["numeroControl"] != control:
+                self._error(fila, f"La placa {auto.placa} ya está en el archivo (fila {previo[0]})")
+                continue
+            self.autos[clave] = (fila, {
+                "placa": auto.placa,
+                "placa_clave": clave,
+                "marca": auto.marca,
+                "modelo": auto.modelo,
+                "color": auto.color,
+                "numeroControl": control,
+            })
+
+    def _descartar(self, control: str, mensaje: str):
+        """Quita una persona (y sus autos) de la importación y reporta todas sus filas"""
+        for fila in self._filas_persona.pop(control, []):
+            self._error(fila, mensaje)
+        persona = self.personas.pop(control)
+        self._correos.pop(persona["correo"], None)
+        for clave in [c for c, (_, auto) in self.autos.items() if auto["numeroControl"] == control]:
+            del self.autos[clave]
+
+    def _descartar_correos_ajenos(self, conn):
+        """El correo también es único: no se puede usar el de una persona ya registrada con otro numeroControl"""
+        for bloque in _bloques(list(self._correos), self.tam_bloque):
+            existentes = conn.execute(
+                select(Persona.numeroControl, Persona.correo).where(Persona.correo.in_(bloque))
+            ).all()
+            for control_bd, correo in existentes:
+                control = self._correos.get(correo)
+                if control is not None and control != control_bd:
+                    self._descartar(control, f"El correo {correo} ya pertenece a la persona con numeroControl {control_bd}")
+
+    def _escribir_postgres(self, conn):
+        conn.execute(text(
+            'CREATE TEMP TABLE _importar_personas '
+            '(nombre text, edad integer, "numeroControl" text, correo text) ON COMMIT DROP'
+        ))
+        conn.execute(text(
+            'CREATE TEMP TABLE _importar_autos '
+            '(placa text, placa_clave text, marca text, modelo text, color text, "numeroControl" text) ON COMMIT DROP'
+        ))
+        for bloque in _bloques(list(self.personas.values()), self.tam_bloque):
+            _copiar(conn, "_importar_personas", COLUMNAS_PERSONA, bloque)
+        conn.execute(text(_UPSERT_PERSONAS))
+
+        autos = [auto for _, auto in self.autos.values()]
+        for bloque in _bloques(autos, self.tam_bloque):
+            _copiar(conn, "_importar_autos", (*COLUMNAS_AUTO, "placa_clave", "numeroControl"), bloque)
+        conn.execute(text(_UPSERT_AUTOS))
+
+    def _escribir_executemany(self, conn):
+        tabla = Persona.__table__
+        upsert = sqlite_insert(tabla)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[tabla.c.numeroControl],
+            set_={c: upsert.excluded[c] for c in ("nombre", "edad", "correo")},
+        )
+        for bloque in _bloques(list(self.personas.values()), self.tam_bloque):
+            conn.execute(upsert, bloque)
+
+        ids: dict[str, int] = {}
+        for bloque in _bloques(list(self.personas), self.tam_bloque):
+            ids.update(conn.execute(
+                select(Persona.numeroControl, Persona.id).where(Persona.numeroControl.in_(bloque))
+            ).all())
+
+        tabla = Auto.__table__
+        upsert = sqlite_insert(tabla)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[tabla.c.placa_clave],
+            set_={c: upsert.excluded[c] for c in (*COLUMNAS_AUTO, "persona_id")},
+        )
+        autos = [
+            {**{c: auto[c] for c in (*COLUMNAS_AUTO, "placa_clave")}, "persona_id": ids[auto["numeroControl"]]}
+            for _, auto in self.autos.values()
+        ]
+        for bloque in _bloques(autos, self.tam_bloque):
+            conn.execute(upsert, bloque)
+
+    def escribir(self, engine) -> dict:
+        with engine.begin() as conn:
+            self._descartar_correos_ajenos(conn)
+            if conn.dialect.name == "postgresql":
+                self._escribir_postgres(conn)
+            else:
+                self._escribir_executemany(conn)
+        return self.resultado()
+
+    def resultado(self) -> dict:
+        return {
+            "filas": self.filas,
+            "personas": len(self.personas),
+            "autos": len(self.autos),
+            "errores": sorted(self.errores, key=lambda e: e["fila"]),
+        }
+
+
+def importar_archivo(engine, archivo, formato: str, tam_bloque: int = IMPORT_CHUNK_SIZE) -> dict:
+    """Importa un archivo de texto ya abierto; devuelve conteos y el reporte de errores por fila"""
+    importador = ImportadorPersonas(tam_bloque)
+    for fila, datos, error in leer_filas(archivo, formato):
+        importador.agregar(fila, datos, error)
+    return importador.escribir(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa personas y sus autos desde CSV o NDJSON")
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], help="Por defecto, según la extensión del archivo")
+    parser.add_argument("--bloque", type=int, default=IMPORT_CHUNK_SIZE, help="Filas por bloque de COPY/executemany")
+    parser.add_argument("--errores", help="Escribe el reporte de errores (NDJSON) en este archivo")
+    args = parser.parse_args()
+
+    from .config import engine
+
+    inicio = time.perf_counter()
+    with open(args.archivo, encoding="utf-8-sig", newline="") as archivo:
+        resultado = importar_archivo(engine, archivo, args.formato or formato_por_nombre(args.archivo), args.bloque)
+    segundos = time.perf_counter() - inicio
+
+    errores = resultado["errores"]
+    print(f"{resultado['filas']} filas, {resultado['personas']} personas, {resultado['autos']} autos, "
+          f"{len(errores)} errores en {segundos:.1f} s")
+    if args.errores:
+        with open(args.errores, "w", encoding="utf-8") as salida:
+            salida.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in errores)
+    else:
+        for e in errores[:20]:
+            print(f"  fila {e['fila']}: {e['error']}")
+        if len(errores) > 20:
+            print(f"  ... y {len(errores) - 20} más (usa --errores para el reporte completo)")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
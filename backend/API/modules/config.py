@@ -1,6 +1,7 @@
 import os 
 from pathlib import Path
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -9,7 +10,10 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
 MAIL_FROM_ADDRESS = os.getenv('MAIL_FROM_ADDRESS')
 
-if SENDGRID_API_KEY is None:
+# "sendgrid" o "stub" (no sale nada a la red; útil en desarrollo y pruebas).
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "sendgrid")
+
+if EMAIL_TRANSPORT == "sendgrid" and SENDGRID_API_KEY is None:
     raise ValueError("La API Key de SendGrid no está definida en el archivo .env.")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -26,8 +30,147 @@ else:
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg2://", 1)
 
+# Driver async para las rutas; se puede fijar con ASYNC_DATABASE_URL.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+if not ASYNC_DATABASE_URL:
+    ASYNC_DATABASE_URL = DATABASE_URL
+    for prefijo in ("postgresql+psycopg2://", "postgresql://"):
+        if ASYNC_DATABASE_URL.startswith(prefijo):
+            ASYNC_DATABASE_URL = "postgresql+asyncpg://" + ASYNC_DATABASE_URL[len(prefijo):]
+            # asyncpg no entiende sslmode; su equivalente es ssl.
+            ASYNC_DATABASE_URL = ASYNC_DATABASE_URL.replace("sslmode=", "ssl=")
+            break
+    else:
+        if ASYNC_DATABASE_URL.startswith("sqlite://"):
+            ASYNC_DATABASE_URL = ASYNC_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# Pool de conexiones de las rutas (por proceso de uvicorn).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+
+# Motor síncrono: arranque, migraciones y scripts.
 engine = create_engine(DATABASE_URL, echo=False, future=True)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-Base = declarative_base()
\ No newline at end of file
+_opciones_pool = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT_S,
+    "pool_recycle": DB_POOL_RECYCLE_S,
+    "pool_pre_ping": True,
+}
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **_opciones_pool)
+
+# Session síncrona que envuelve cada AsyncSession; los eventos de sesión se registran sobre ella.
+AsyncSessionSync = sessionmaker(autoflush=False)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=AsyncSessionSync, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_db():
+    """Dependencia de FastAPI: una AsyncSession por petición"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+Base = declarative_base()
+
+# ========== OCR ==========
+
+# Perfil de modelos por defecto y perfiles que se cargan al arrancar (separados por coma).
+OCR_PROFILE = os.getenv("OCR_PROFILE", "estandar")
+OCR_PROFILES = [p.strip() for p in os.getenv("OCR_PROFILES", OCR_PROFILE).split(",") if p.strip()]
+if OCR_PROFILE not in OCR_PROFILES:
+    OCR_PROFILES.insert(0, OCR_PROFILE)
+
+# Hilos de Paddle por instancia; el pool por defecto reparte los núcleos entre instancias.
+OCR_CPU_THREADS = int(os.getenv("OCR_CPU_THREADS", "2"))
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", str(max(1, (os.cpu_count() or 1) // max(1, OCR_CPU_THREADS)))))
+
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
+OCR_BATCH_WAIT_MS = float(os.getenv("OCR_BATCH_WAIT_MS", "15"))
+
+# /ocr/placas: tope del tamaño descomprimido (suma declarada) y de archivos de los zips de una petición.
+OCR_ZIP_MAX_BYTES = int(os.getenv("OCR_ZIP_MAX_BYTES", str(512 * 1024 * 1024)))
+OCR_ZIP_MAX_FILES = int(os.getenv("OCR_ZIP_MAX_FILES", "10000"))
+
+# Detector de placas (YOLO exportado a .onnx o .tflite); vacío lo desactiva.
+PLATE_DETECTOR_MODEL = os.getenv("PLATE_DETECTOR_MODEL", "")
+PLATE_DETECTOR_CONF = float(os.getenv("PLATE_DETECTOR_CONF", "0.25"))
+PLATE_DETECTOR_IMGSZ = int(os.getenv("PLATE_DETECTOR_IMGSZ", "640"))
+
+# Preproceso: lado largo máximo (0 = sin límite), decodificación reducida según el encabezado JPEG,
+# escala de grises y normalización de contraste (CLAHE).
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1280"))
+OCR_REDUCED_DECODE = os.getenv("OCR_REDUCED_DECODE", "true").lower() == "true"
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "false").lower() == "true"
+OCR_CONTRAST = os.getenv("OCR_CONTRAST", "false").lower() == "true"
+
+# Cache de resultados OCR (0 entradas la desactiva).
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "2048"))
+OCR_CACHE_TTL_S = float(os.getenv("OCR_CACHE_TTL_S", "300"))
+# Nivel perceptual (dHash del cuadro completo, compartido entre clientes): -1 lo desactiva. El dHash
+# casi no ve el texto de la placa, así que dos autos distintos frente al mismo fondo pueden dar distancia 0.
+OCR_CACHE_MAX_DISTANCE = int(os.getenv("OCR_CACHE_MAX_DISTANCE", "-1"))
+
+# Modo stream: cuadros a menos de STREAM_SKIP_DISTANCE bits (dHash) del último procesado no pasan
+# por el OCR (solo refrescan su lectura en la votación), salvo que hayan pasado STREAM_SKIP_MAX_S
+# desde el último OCR: entonces se leen de nuevo y cuentan como lectura independiente.
+STREAM_SKIP_DISTANCE = int(os.getenv("STREAM_SKIP_DISTANCE", "4"))
+STREAM_SKIP_MAX_S = float(os.getenv("STREAM_SKIP_MAX_S", "0.5"))
+STREAM_VOTE_WINDOW_S = float(os.getenv("STREAM_VOTE_WINDOW_S", "3"))
+STREAM_MIN_READINGS = int(os.getenv("STREAM_MIN_READINGS", "3"))
+STREAM_MIN_SHARE = float(os.getenv("STREAM_MIN_SHARE", "0.6"))
+STREAM_COOLDOWN_S = float(os.getenv("STREAM_COOLDOWN_S", "30"))
+
+# Búsqueda aproximada de placas cuando la lectura del OCR no coincide exacto.
+PLATE_FUZZY_MAX_DISTANCE = float(os.getenv("PLATE_FUZZY_MAX_DISTANCE", "1.5"))
+PLATE_FUZZY_LIMIT = int(os.getenv("PLATE_FUZZY_LIMIT", "5"))
+
+
+# ========== Cache de consultas ==========
+
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", "10000"))
+LOOKUP_CACHE_TTL_S = float(os.getenv("LOOKUP_CACHE_TTL_S", "60"))
+
+
+# ========== Paginación ==========
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+# Decisiones por petición en la revisión masiva de incidencias.
+REVIEW_BATCH_MAX = int(os.getenv("REVIEW_BATCH_MAX", "1000"))
+
+
+# ========== Imágenes de incidencias ==========
+
+# Almacén por contenido (SHA-256) de las fotos; en Docker debe ser un volumen.
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", str(Path(__file__).resolve().parents[2] / "data" / "imagenes"))
+IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", "320"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(15 * 1024 * 1024)))
+
+
+# ========== Exportaciones ==========
+
+# Filas por bloque del cursor del lado del servidor (yield_per).
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+# Filas por bloque (COPY / executemany) en la importación masiva de personas y autos.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+
+
+# ========== Correos ==========
+
+# Bandeja de salida: el worker toma lotes de correos pendientes y reintenta con backoff exponencial.
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_POLL_S = float(os.getenv("EMAIL_POLL_S", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_S = float(os.getenv("EMAIL_RETRY_BASE_S", "30"))
+EMAIL_RETRY_MAX_S = float(os.getenv("EMAIL_RETRY_MAX_S", "3600"))
+EMAIL_TIMEOUT_S = float(os.getenv("EMAIL_TIMEOUT_S", "10"))
+# Tiempo que un lote reclamado queda reservado para su worker mientras se envía (mayor que EMAIL_TIMEOUT_S).
+EMAIL_LEASE_S = float(os.getenv("EMAIL_LEASE_S", "120"))
+# Con el transporte stub, directorio donde se escribe cada correo (vacío = solo en memoria).
+EMAIL_STUB_DIR = os.getenv("EMAIL_STUB_DIR", "")
@@ -0,0 +1,203 @@
+import asyncio
+import random
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+from sqlalchemy import func, select
+
+from .config import (
+    AsyncSessionLocal, EMAIL_BATCH_SIZE, EMAIL_LEASE_S, EMAIL_MAX_ATTEMPTS, EMAIL_POLL_S, EMAIL_RETRY_BASE_S,
+    EMAIL_RETRY_MAX_S, EMAIL_STUB_DIR, EMAIL_TIMEOUT_S, EMAIL_TRANSPORT, MAIL_FROM_ADDRESS, SENDGRID_API_KEY,
+)
+from .emailService import ahora_utc
+from .metrics import SENDGRID_SEGUNDOS
+from .models import CorreoPendiente
+
+
+class ErrorPermanente(Exception):
+    """El proveedor rechazó el correo; reintentarlo no va a servir"""
+
+
+class TransporteSendGrid:
+    """API v3 de SendGrid con un solo cliente HTTP (conexiones keep-alive reutilizadas entre envíos)"""
+
+    def __init__(self, api_key: str = SENDGRID_API_KEY, remitente: str = MAIL_FROM_ADDRESS,
+                 timeout_s: float = EMAIL_TIMEOUT_S, conexiones: int = EMAIL_BATCH_SIZE):
+        self.remitente = remitente
+        self._cliente = httpx.AsyncClient(
+            base_url="https://api.sendgrid.com",
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout_s,
+            limits=httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones),
+        )
+
+    async def enviar(self, correo: CorreoPendiente):
+        cuerpo = {
+            "personalizations": [{"to": [{"email": correo.destinatario}]}],
+            "from": {"email": self.remitente},
+            "subject": correo.asunto,
+            "content": [{"type": "text/plain", "value": correo.cuerpo}],
+        }
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self._cliente.post("/v3/mail/send", json=cuerpo)
+        except httpx.HTTPError:
+            SENDGRID_SEGUNDOS.labels("error").observe(time.perf_counter() - inicio)
+            raise
+        SENDGRID_SEGUNDOS.labels("ok" if respuesta.is_success else "error").observe(time.perf_counter() - inicio)
+
+        if respuesta.is_success:
+            return
+        detalle = f"SendGrid {respuesta.status_code}: {respuesta.text[:500]}"
+        # 429 y 5xx son temporales; cualquier otro 4xx (destinatario inválido, llave mala...) no.
+        if respuesta.status_code == 429 or respuesta.status_code >= 500:
+            raise RuntimeError(detalle)
+        raise ErrorPermanente(detalle)
+
+    async def cerrar(self):
+        await self._cliente.aclose()
+
+
+class TransporteStub:
+    """No envía nada: guarda los correos en memoria y, si hay directorio, los escribe como .txt"""
+
+    def __init__(self, directorio: str = EMAIL_STUB_DIR):
+        self.directorio = Path(directorio) if directorio else None
+        self.enviados: list[dict] = []
+
+    async def enviar(self, correo: CorreoPendiente):
+        datos = {"id": correo.id, "destinatario": correo.destinatario, "asunto": correo.asunto, "cuerpo": correo.cuerpo}
+        self.enviados.append(datos)
+        if self.directorio is not None:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            texto = f"Para: {correo.destinatario}\nAsunto: {correo.asunto}\n\n{correo.cuerpo}\n"
+            await asyncio.to_thread((self.directorio / f"{correo.id:08d}.txt").write_text, texto)
+
+    async def cerrar(self):
+        pass
+
+
+def crear_transporte(nombre: str = EMAIL_TRANSPORT):
+    if nombre == "stub":
+        return TransporteStub()
+    if nombre == "sendgrid":
+        return TransporteSendGrid()
+    raise ValueError(f"Transporte de correo desconocido: {nombre}")
+
+
+def espera_reintento(intentos: int, base_s: float = EMAIL_RETRY_BASE_S, max_s: float = EMAIL_RETRY_MAX_S) -> float:
+    """Backoff exponencial con jitter: base * 2^(intentos-1), entre 50% y 100% del valor, con tope"""
+    espera = min(max_s, base_s * 2 ** (intentos - 1))
+    return espera * random.uniform(0.5, 1.0)
+
+
+class DespachadorCorreos:
+    """Worker en segundo plano que vacía la bandeja de salida `correos_pendientes`.
+
+    Reclama lotes de correos pendientes con FOR UPDATE SKIP LOCKED y un arriendo
+    (varios procesos de uvicorn no mandan el mismo correo dos veces), los envía
+    en paralelo por el mismo transporte y guarda el resultado. Los errores temporales se
+    reintentan con backoff; tras `max_intentos`, o con un error permanente, el
+    correo queda como "fallido". `avisar()` lo despierta sin esperar el sondeo.
+    """
+
+    def __init__(self, transporte=None, tam_lote: int = EMAIL_BATCH_SIZE, sondeo_s: float = EMAIL_POLL_S,
+                 max_intentos: int = EMAIL_MAX_ATTEMPTS, arriendo_s: float = EMAIL_LEASE_S):
+        self.transporte = transporte or crear_transporte()
+        self.tam_lote = tam_lote
+        self.sondeo_s = sondeo_s
+        self.max_intentos = max_intentos
+        self.arriendo_s = arriendo_s
+        self._aviso = asyncio.Event()
+        self._tarea: asyncio.Task | None = None
+
+    def iniciar(self):
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        await self.transporte.cerrar()
+
+    def avisar(self):
+        self._aviso.set()
+
+    async def _ciclo(self):
+        while True:
+            try:
+                procesados = await self.procesar_lote()
+            except Exception as e:
+                print(f"[correos] Error procesando la bandeja de salida: {e}")
+                procesados = 0
+
+            if procesados >= self.tam_lote:
+                continue
+            try:
+                await asyncio.wait_for(self._aviso.wait(), timeout=self.sondeo_s)
+            except asyncio.TimeoutError:
+                pass
+            self._aviso.clear()
+
+    async def _enviar(self, correo: CorreoPendiente) -> Exception | None:
+        try:
+            await self.transporte.enviar(correo)
+            return None
+        except Exception as e:
+            return e
+
+    async def procesar_lote(self) -> int:
+        """Envía un lote de correos vencidos y devuelve cuántos se procesaron.
+
+        Los correos se reclaman en una transacción corta (se les corre
+        `siguiente_intento` por `arriendo_s`, así otro worker no los toma), los
+        envíos van fuera de cualquier transacción y el resultado se guarda en una
+        segunda transacción corta. Si el proceso muere a medio envío, los correos
+        vuelven a quedar vencidos al terminar el arriendo y se reintentan.
+        """
+        async with AsyncSessionLocal() as db:
+            correos = (await db.scalars(
+                select(CorreoPendiente)
+                .where(CorreoPendiente.estado == "pendiente", CorreoPendiente.siguiente_intento <= ahora_utc())
+                .order_by(CorreoPendiente.id)
+                .limit(self.tam_lote)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not correos:
+                return 0
+            arriendo = ahora_utc() + timedelta(seconds=self.arriendo_s)
+            for correo in correos:
+                correo.intentos += 1
+                correo.siguiente_intento = arriendo
+            await db.commit()
+
+            errores = await asyncio.gather(*(self._enviar(c) for c in correos))
+
+            ahora = ahora_utc()
+            for correo, error in zip(correos, errores):
+                if error is None:
+                    correo.estado = "enviado"
+                    correo.enviado = ahora
+                    correo.ultimo_error = None
+                    continue
+
+                correo.ultimo_error = str(error)[:1000]
+                if isinstance(error, ErrorPermanente) or correo.intentos >= self.max_intentos:
+                    correo.estado = "fallido"
+                    print(f"[correos] Correo {correo.id} a {correo.destinatario} fallido: {error}")
+                else:
+                    correo.siguiente_intento = ahora + timedelta(seconds=espera_reintento(correo.intentos))
+            await db.commit()
+            return len(correos)
+
+    async def estadisticas(self) -> dict:
+        async with AsyncSessionLocal() as db:
+            filas = await db.execute(
+                select(CorreoPendiente.estado, func.count()).group_by(CorreoPendiente.estado)
+            )
+            return {estado: total for estado, total in filas}
@@ -1,28 +1,34 @@
-import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content
-from .config import SENDGRID_API_KEY, MAIL_FROM_ADDRESS
+from datetime import datetime, timezone
 
+from .models import CorreoPendiente
 
-def send_email(subject, to_email, body):
-    sg = sendgrid.SendGridAPIClient(api_key=SENDGRID_API_KEY)
 
-    from_email = Email(MAIL_FROM_ADDRESS)  
-    to_email = To(to_email)
-    content = Content("text/plain", body)
+def ahora_utc() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
-    mail = Mail(from_email, to_email, subject, content)
 
-    try:
-        response = sg.client.mail.send.post(request_body=mail.get())
-        print(f"Email enviado a {to_email}: Status {response.status_code}")
-        return response
-    except Exception as e:
-        print(f"Error enviando email: {e}")
-        return None
+def encolar_correo(db, destinatario: str, asunto: str, cuerpo: str) -> CorreoPendiente:
+    """Agrega el correo a la bandeja de salida dentro de la transacción de `db`.
 
+    Se envía solo si la transacción hace commit; el worker de `emailOutbox` lo
+    manda en segundo plano.
+    """
+    ahora = ahora_utc()
+    correo = CorreoPendiente(
+        destinatario=destinatario,
+        asunto=asunto,
+        cuerpo=cuerpo,
+        estado="pendiente",
+        intentos=0,
+        creado=ahora,
+        siguiente_intento=ahora,
+    )
+    db.add(correo)
+    return correo
 
-def enviar_correo_reportante(email_reportante, incidencia_id, fecha, hora, descripcion, marca, modelo, placa):
-    """Envía correo a la persona que levantó la incidencia (aprobada)"""
+
+def correo_reportante(incidencia_id, fecha, hora, descripcion, marca, modelo, placa) -> tuple[str, str]:
+    """(asunto, cuerpo) del correo a la persona que levantó la incidencia (aprobada)"""
     subject = f"Incidencia Aprobada - Reporte #{incidencia_id}"
     
     body = f"""Hola,
@@ -42,11 +48,11 @@ Gracias por contribuir a mantener el orden en las instalaciones.
 Saludos,
 Sistema de Control Vehicular VAFE"""
 
-    return send_email(subject, email_reportante, body)
+    return subject, body
 
 
-def enviar_correo_persona_afectada(nombre, email, numero_incidencias, fecha, hora, descripcion, marca, modelo, placa, incidencia_id):
-    """Envía correo a la persona afectada por la incidencia"""
+def correo_persona_afectada(nombre, numero_incidencias, fecha, hora, descripcion, marca, modelo, placa, incidencia_id) -> tuple[str, str]:
+    """(asunto, cuerpo) del correo a la persona afectada por la incidencia"""
     
     if numero_incidencias < 3:
         subject = f"Notificación de Incidencia #{numero_incidencias} - Advertencia"
@@ -94,10 +100,10 @@ Para solicitar la reactivación de tu acceso, por favor contacta al administrado
 Saludos,
 Sistema de Control Vehicular VAFE"""
 
-    return send_email(subject, email, body)
+    return subject, body
 
 
-def enviar_correo_incidencia_rechazada(email_reportante, incidencia_id, fecha, hora, descripcion):
+def correo_incidencia_rechazada(incidencia_id, fecha, hora, descripcion) -> tuple[str, str]:
     subject = f"Incidencia Rechazada - Reporte #{incidencia_id}"
     
     body = f"""Hola,
@@ -115,4 +121,66 @@ La incidencia no procede según los criterios de evaluación.
 Saludos,
 Sistema de Control Vehicular VAFE"""
 
-    return send_email(subject, email_reportante, body)
\ No newline at end of file
+    return subject, body
+
+def _linea_incidencia(incidencia, con_vehiculo: bool = True) -> str:
+    linea = f"- #{incidencia.id} ({incidencia.fecha} {incidencia.hora or ''}".rstrip() + f"): {incidencia.descripcion}"
+    if con_vehiculo and incidencia.auto is not None:
+        linea += f" | {incidencia.auto.marca} {incidencia.auto.modelo} - Placa {incidencia.auto.placa}"
+    return linea
+
+
+def correo_revision(nombre, numero_incidencias, afectadas, reportes_aprobados, reportes_rechazados) -> tuple[str, str]:
+    """(asunto, cuerpo) de un solo correo con todo lo que una revisión masiva le toca a una persona.
+
+    `afectadas` son las incidencias aprobadas en su contra y `reportes_*` las que
+    ella levantó. Si solo hay una, se usa la plantilla individual de siempre.
+    """
+    if len(afectadas) + len(reportes_aprobados) + len(reportes_rechazados) == 1:
+        for inc in afectadas:
+            return correo_persona_afectada(
+                nombre, numero_incidencias, inc.fecha, inc.hora, inc.descripcion,
+                inc.auto.marca, inc.auto.modelo, inc.auto.placa, inc.id,
+            )
+        for inc in reportes_aprobados:
+            return correo_reportante(
+                inc.id, inc.fecha, inc.hora, inc.descripcion, inc.auto.marca, inc.auto.modelo, inc.auto.placa
+            )
+        for inc in reportes_rechazados:
+            return correo_incidencia_rechazada(inc.id, inc.fecha, inc.hora, inc.descripcion)
+
+    secciones = []
+    if afectadas:
+        if numero_incidencias >= 3:
+            subject = "ACCESO BLOQUEADO - Incidencias Registradas"
+            aviso = f"""🚫 ESTADO: BLOQUEADO
+
+Has acumulado {numero_incidencias} incidencias, por lo que tu acceso a las instalaciones ha sido suspendido.
+Para solicitar la reactivación de tu acceso, por favor contacta al administrador."""
+        else:
+            subject = f"Notificación de {len(afectadas)} Incidencias - Advertencia"
+            aviso = f"""⚠️ ADVERTENCIA: Actualmente tienes {numero_incidencias} incidencia(s) registrada(s). 
+Al llegar a 3 incidencias, tu acceso será bloqueado automáticamente."""
+        lineas = "\n".join(_linea_incidencia(inc) for inc in afectadas)
+        secciones.append(f"Se registraron las siguientes incidencias en tu contra:\n\n{lineas}\n\n{aviso}")
+    else:
+        subject = "Resultado de la Revisión de tus Reportes"
+
+    if reportes_aprobados:
+        lineas = "\n".join(_linea_incidencia(inc) for inc in reportes_aprobados)
+        secciones.append(f"Tus siguientes reportes fueron APROBADOS por el administrador:\n\n{lineas}")
+    if reportes_rechazados:
+        lineas = "\n".join(_linea_incidencia(inc, con_vehiculo=False) for inc in reportes_rechazados)
+        secciones.append(
+            f"Tus siguientes reportes fueron RECHAZADOS (no proceden según los criterios de evaluación):\n\n{lineas}"
+        )
+
+    cuerpo = "\n\n".join(secciones)
+    body = f"""Estimado/a {nombre},
+
+{cuerpo}
+
+Saludos,
+Sistema de Control Vehicular VAFE"""
+
+    return subject, body
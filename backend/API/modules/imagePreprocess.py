@@ -0,0 +1,111 @@
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from .config import OCR_CONTRAST, OCR_GRAYSCALE, OCR_MAX_SIDE, OCR_REDUCED_DECODE
+
+
+# Marcadores SOF de JPEG (todos los C0-CF salvo DHT, JPG y DAC).
+_MARCADORES_SOF = {m for m in range(0xC0, 0xD0)} - {0xC4, 0xC8, 0xCC}
+
+_FLAGS_REDUCIDOS = {
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+}
+
+
+@dataclass
+class ConfigPreproceso:
+    max_lado: int = OCR_MAX_SIDE
+    decodificacion_reducida: bool = OCR_REDUCED_DECODE
+    escala_grises: bool = OCR_GRAYSCALE
+    normalizar_contraste: bool = OCR_CONTRAST
+
+
+def dimensiones_jpeg(datos: bytes) -> tuple[int, int] | None:
+    """Lee (ancho, alto) del encabezado SOF de un JPEG sin decodificarlo"""
+    if datos[:2] != b"\xff\xd8":
+        return None
+
+    i, n = 2, len(datos)
+    while i + 9 < n:
+        if datos[i] != 0xFF:
+            i += 1
+            continue
+        marcador = datos[i + 1]
+        if marcador == 0xFF:
+            i += 1
+            continue
+        if marcador == 0x01 or 0xD0 <= marcador <= 0xD8:
+            i += 2
+            continue
+        if marcador in _MARCADORES_SOF:
+            alto = int.from_bytes(datos[i + 5:i + 7], "big")
+            ancho = int.from_bytes(datos[i + 7:i + 9], "big")
+            return ancho, alto
+        i += 2 + int.from_bytes(datos[i + 2:i + 4], "big")
+    return None
+
+
+def factor_reduccion(ancho: int, alto: int, max_lado: int) -> int:
+    """Mayor factor (2, 4 u 8) que deja el lado largo todavía por encima de max_lado"""
+    lado = max(ancho, alto)
+    for factor in (8, 4, 2):
+        if lado // factor >= max_lado:
+            return factor
+    return 1
+
+
+def preprocesar_imagen(image_bytes: bytes, config: ConfigPreproceso | None = None) -> tuple[np.ndarray, dict[str, float]]:
+    """Decodifica y prepara la imagen para el OCR; devuelve la imagen BGR y los tiempos de cada paso en ms"""
+    config = config or ConfigPreproceso()
+    tiempos: dict[str, float] = {}
+
+    if not image_bytes:
+        raise ValueError("Imagen vacía")
+
+    inicio = time.perf_counter()
+    flag = cv2.IMREAD_GRAYSCALE if config.escala_grises else cv2.IMREAD_COLOR
+    if config.decodificacion_reducida and config.max_lado > 0:
+        dims = dimensiones_jpeg(image_bytes)
+        if dims:
+            factor = factor_reduccion(*dims, config.max_lado)
+            if factor > 1:
+                flag = _FLAGS_REDUCIDOS[(factor, config.escala_grises)]
+
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
+    if img is None:
+        raise ValueError("No se pudo decodificar la imagen (cv2.imdecode dio None)")
+    tiempos["decodificacion"] = (time.perf_counter() - inicio) * 1000
+
+    if config.max_lado > 0:
+        inicio = time.perf_counter()
+        alto, ancho = img.shape[:2]
+        lado = max(alto, ancho)
+        if lado > config.max_lado:
+            escala = config.max_lado / lado
+            img = cv2.resize(img, (round(ancho * escala), round(alto * escala)), interpolation=cv2.INTER_AREA)
+        tiempos["redimension"] = (time.perf_counter() - inicio) * 1000
+
+    if config.normalizar_contraste:
+        inicio = time.perf_counter()
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        if img.ndim == 2:
+            img = clahe.apply(img)
+        else:
+            lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+            lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+            img = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+        tiempos["contraste"] = (time.perf_counter() - inicio) * 1000
+
+    if img.ndim == 2:
+        # PaddleOCR y el detector esperan 3 canales.
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+    return img, tiempos
@@ -0,0 +1,165 @@
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+import cv2
+
+from .config import IMAGE_STORE_DIR, IMAGE_THUMB_SIZE
+from .imagePreprocess import ConfigPreproceso, preprocesar_imagen
+
+_REFERENCIA = re.compile(r"[0-9a-f]{64}")
+_RANGO = re.compile(r"bytes=(\d*)-(\d*)")
+_DATA_URI = re.compile(r"data:[\w/+.-]+;base64,", re.IGNORECASE)
+_TAM_BLOQUE = 64 * 1024
+
+_FIRMAS = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+
+def es_referencia(texto: str) -> bool:
+    """True si el texto es el SHA-256 (hex) de una imagen del almacén"""
+    return _REFERENCIA.fullmatch(texto) is not None
+
+
+def decodificar_payload(texto: str) -> bytes | None:
+    """Bytes de una imagen mandada inline (base64 o data URI); None si el texto no lo es"""
+    texto = _DATA_URI.sub("", texto.strip(), count=1)
+    if len(texto) < 16:
+        return None
+    try:
+        return base64.b64decode(texto, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def urls_imagenes(imagenes: str | None, miniatura: bool = False) -> list[str]:
+    """URLs de las imágenes de una incidencia.
+
+    Las entradas que no son referencias al almacén (rutas locales del teléfono que
+    guardaban las versiones anteriores de la app) se devuelven tal cual: la app
+    todavía las muestra desde el dispositivo que tomó la foto.
+    """
+    urls = []
+    for referencia in json.loads(imagenes) if imagenes else []:
+        if not es_referencia(referencia):
+            urls.append(referencia)
+        elif miniatura:
+            urls.append(f"/imagenes/{referencia}/miniatura")
+        else:
+            urls.append(f"/imagenes/{referencia}")
+    return urls
+
+
+def rango_bytes(encabezado: str | None, tamano: int) -> tuple[int, int] | None:
+    """(inicio, fin) inclusivos de un encabezado Range de un solo rango.
+
+    Devuelve None si no hay encabezado o no se entiende (se sirve el archivo
+    completo) y lanza ValueError si el rango no se puede satisfacer (416).
+    """
+    coincidencia = _RANGO.fullmatch(encabezado.strip()) if encabezado else None
+    if coincidencia is None or coincidencia.group(1) == coincidencia.group(2) == "":
+        return None
+
+    inicio_txt, fin_txt = coincidencia.groups()
+    if inicio_txt:
+        inicio = int(inicio_txt)
+        fin = min(int(fin_txt), tamano - 1) if fin_txt else tamano - 1
+    else:
+        # bytes=-N: los últimos N bytes.
+        inicio, fin = max(0, tamano - int(fin_txt)), tamano - 1
+
+    if inicio > fin or inicio >= tamano:
+        raise ValueError("Rango fuera del archivo")
+    return inicio, fin
+
+
+class AlmacenImagenes:
+    """Fotos guardadas en disco por su SHA-256, con una miniatura JPEG de cada una.
+
+    La misma imagen subida dos veces ocupa un solo archivo. Las filas de la BD
+    guardan solo el hash; las escrituras son atómicas (archivo temporal y
+    rename), así que varios procesos pueden compartir el directorio.
+    """
+
+    def __init__(self, raiz: str = IMAGE_STORE_DIR, lado_miniatura: int = IMAGE_THUMB_SIZE):
+        self.raiz = Path(raiz)
+        self.config_miniatura = ConfigPreproceso(
+            max_lado=lado_miniatura, decodificacion_reducida=True, escala_grises=False, normalizar_contraste=False
+        )
+
+    def ruta(self, sha: str) -> Path:
+        return self.raiz / "originales" / sha[:2] / sha
+
+    def ruta_miniatura(self, sha: str) -> Path:
+        return self.raiz / "miniaturas" / sha[:2] / f"{sha}.jpg"
+
+    def existe(self, sha: str) -> bool:
+        return es_referencia(sha) and self.ruta(sha).is_file()
+
+    @staticmethod
+    def _escribir(ruta: Path, datos: bytes):
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+    def _generar_miniatura(self, sha: str, datos: bytes):
+        img, _ = preprocesar_imagen(datos, self.config_miniatura)
+        ok, jpeg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if not ok:
+            raise ValueError("No se pudo generar la miniatura")
+        self._escribir(self.ruta_miniatura(sha), jpeg.tobytes())
+
+    def guardar(self, datos: bytes) -> str:
+        """Guarda la imagen (si no estaba) con su miniatura y devuelve su hash; ValueError si no es imagen"""
+        sha = hashlib.sha256(datos).hexdigest()
+        if self.ruta(sha).is_file() and self.ruta_miniatura(sha).is_file():
+            return sha
+
+        # La miniatura se genera primero: de paso valida que los bytes sean una imagen.
+        self._generar_miniatura(sha, datos)
+        self._escribir(self.ruta(sha), datos)
+        return sha
+
+    def miniatura(self, sha: str) -> Path:
+        """Ruta de la miniatura, regenerándola si se perdió"""
+        ruta = self.ruta_miniatura(sha)
+        if not ruta.is_file():
+            self._generar_miniatura(sha, self.ruta(sha).read_bytes())
+        return ruta
+
+    def tipo_contenido(self, sha: str) -> str:
+        with open(self.ruta(sha), "rb") as f:
+            cabecera = f.read(12)
+        if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+            return "image/webp"
+        for firma, tipo in _FIRMAS:
+            if cabecera.startswith(firma):
+                return tipo
+        return "application/octet-stream"
+
+    def leer(self, sha: str, inicio: int, fin: int):
+        """Generador de los bytes [inicio, fin] de la imagen, en bloques"""
+        with open(self.ruta(sha), "rb") as f:
+            f.seek(inicio)
+            restante = fin - inicio + 1
+            while restante > 0:
+                bloque = f.read(min(_TAM_BLOQUE, restante))
+                if not bloque:
+                    break
+                restante -= len(bloque)
+                yield bloque
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from .config import LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL_S
+
+
+class CacheConsultas:
+    """Cache LRU de placa -> respuesta {persona, auto} de la BD, con invalidación explícita.
+
+    Las rutas que modifican autos o personas invalidan por placa o por persona.
+    Varios misses simultáneos de la misma placa esperan a una sola consulta. Si
+    hubo una invalidación mientras la consulta estaba en vuelo, el resultado no
+    se guarda para no dejar datos viejos. El TTL es una red de seguridad para
+    cambios hechos por otros procesos.
+    """
+
+    def __init__(self, capacidad: int = LOOKUP_CACHE_SIZE, ttl_s: float = LOOKUP_CACHE_TTL_S):
+        self.capacidad = capacidad
+        self.ttl = ttl_s
+        self._lock = threading.Lock()
+        self._entradas: OrderedDict[str, tuple[dict | None, float]] = OrderedDict()
+        self._por_persona: dict[int, set[str]] = {}
+        self._en_vuelo: dict[str, asyncio.Future] = {}
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _quitar(self, clave: str):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None or entrada[0] is None:
+            return
+        persona_id = entrada[0]["persona"]["id"]
+        claves = self._por_persona.get(persona_id)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_persona[persona_id]
+
+    def _guardar(self, clave: str, valor: dict | None):
+        self._quitar(clave)
+        self._entradas[clave] = (valor, time.monotonic() + self.ttl)
+        if valor is not None:
+            self._por_persona.setdefault(valor["persona"]["id"], set()).add(clave)
+        while len(self._entradas) > self.capacidad:
+            self._quitar(next(iter(self._entradas)))
+
+    async def obtener(self, clave: str, cargar):
+        """Devuelve el valor en cache o lo carga con `await cargar()` una sola vez por clave"""
+        if self.capacidad <= 0:
+            return await cargar()
+
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] >= time.monotonic():
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+
+            self.fallos += 1
+            en_vuelo = self._en_vuelo.get(clave)
+            lider = en_vuelo is None
+            if lider:
+                en_vuelo = self._en_vuelo[clave] = asyncio.get_running_loop().create_future()
+                generacion = self._generacion
+
+        if not lider:
+            try:
+                return await asyncio.shield(en_vuelo)
+            except asyncio.CancelledError:
+                # Si se canceló la petición que cargaba (y no esta), se consulta directo.
+                if not en_vuelo.cancelled():
+                    raise
+                return await cargar()
+
+        try:
+            valor = await cargar()
+        except BaseException as e:
+            with self._lock:
+                del self._en_vuelo[clave]
+            if isinstance(e, asyncio.CancelledError):
+                en_vuelo.cancel()
+            else:
+                en_vuelo.set_exception(e)
+                en_vuelo.exception()  # marcado como leído aunque nadie más esperara
+            raise
+
+        with self._lock:
+            del self._en_vuelo[clave]
+            if generacion == self._generacion:
+                self._guardar(clave, valor)
+        en_vuelo.set_result(valor)
+        return valor
+
+    def invalidar_placa(self, clave: str):
+        with self._lock:
+            self._generacion += 1
+            self._quitar(clave)
+
+    def invalidar_persona(self, persona_id: int):
+        with self._lock:
+            self._generacion += 1
+            for clave in list(self._por_persona.get(persona_id, ())):
+                self._quitar(clave)
+
+    def limpiar(self):
+        """Descarta todo el cache (p. ej. después de una importación masiva)"""
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._por_persona.clear()
+
+    def estadisticas(self) -> dict:
+        return {
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad,
+            "ttl_s": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
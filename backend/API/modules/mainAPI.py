@@ -1,19 +1,57 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import joinedload
-
-from .config import Base, engine, SessionLocal
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, selectinload
+
+from .config import (
+    Base, engine, SessionLocal, async_engine, AsyncSessionLocal, AsyncSessionSync, get_db, OCR_BATCH_SIZE, OCR_CPU_THREADS, OCR_POOL_SIZE, OCR_PROFILE, OCR_PROFILES,
+    PLATE_DETECTOR_CONF, PLATE_DETECTOR_IMGSZ, PLATE_DETECTOR_MODEL, PLATE_FUZZY_LIMIT,
+    PLATE_FUZZY_MAX_DISTANCE, STREAM_SKIP_DISTANCE, STREAM_SKIP_MAX_S, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, IMAGE_MAX_BYTES,
+    EXPORT_CHUNK_SIZE, OCR_ZIP_MAX_BYTES, OCR_ZIP_MAX_FILES,
+)
 from .models import Auto, Incidencia, Perfil, Persona
-from .schemas import AutoCreate, AutoRead, IncidenciaCreate, IncidenciaRead, PersonaCreate, PersonaRead
-from .emailService import enviar_correo_persona_afectada, enviar_correo_reportante, enviar_correo_incidencia_rechazada
-
-from paddleocr import PaddleOCR
-import os
+from .migrations import aplicar_migraciones
+from .schemas import (
+    AutoCreate, AutoRead, AutoResumen, EstatusIncidenciaResultado, ImportacionResultado, IncidenciaCreate,
+    IncidenciaDetalle, IncidenciaListItem, IncidenciaRead, LecturaOCR, PersonaAutoRead, PersonaCreate, PersonaEstatus,
+    PersonaRead, PersonaResumen, ReportanteResumen, ResultadoOCR, RevisionIncidencias, RevisionResultado,
+)
+from .emailService import (
+    correo_incidencia_rechazada, correo_persona_afectada, correo_reportante, correo_revision, encolar_correo,
+)
+from .emailOutbox import DespachadorCorreos
+from .bulkImport import formato_por_nombre, importar_archivo
+from .ocrService import (
+    PERFILES_OCR, LoteadorOCR, PoolOCR, elegir_placa, imagen_sintetica_placa, normalizar_placa, parece_placa,
+)
+from .plateDetector import DetectorPlacas
+from .imagePreprocess import preprocesar_imagen
+from .ocrCache import CacheOCR, dhash, hash_contenido
+from .streamService import VotacionPlacas
+from .plateIndex import IndicePlacas, canonizar_placa
+from .lookupCache import CacheConsultas
+from .imageStore import AlmacenImagenes, decodificar_payload, es_referencia, rango_bytes
+from .metrics import (
+    OCR_EN_VUELO, PETICION_SEGUNDOS, encabezado_server_timing, instrumentar_bd, registrar_etapas_ocr,
+    tiempos_peticion,
+)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+import asyncio
+import csv
+from collections import defaultdict
+from functools import partial
+from typing import Callable
+from datetime import date, datetime, timedelta
+import io
+import time
+import zipfile
 import numpy as np
-import cv2
-import tempfile
 import json
-from pathlib import Path
 
 app = FastAPI(title="API Placas", version="1.0.0")
 
@@ -23,24 +61,118 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "Server-Timing"],
 )
 
-ocr: PaddleOCR | None = None
+instrumentar_bd(engine, SessionLocal)
+instrumentar_bd(async_engine.sync_engine, AsyncSessionSync)
+
+
+@app.middleware("http")
+async def medir_peticion(request: Request, call_next):
+    tiempos: dict[str, float] = {}
+    tiempos_peticion.set(tiempos)
+    inicio = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - inicio
+
+    ruta = request.scope.get("route")
+    PETICION_SEGUNDOS.labels(
+        request.method, ruta.path if ruta is not None else "sin_ruta", str(response.status_code)
+    ).observe(total)
+
+    tiempos["total"] = total * 1000
+    response.headers["Server-Timing"] = encabezado_server_timing(tiempos)
+    return response
+
+# Un pool, un loteador y un cache por perfil de OCR cargado.
+pools_ocr: dict[str, PoolOCR] = {}
+loteadores_ocr: dict[str, LoteadorOCR] = {}
+caches_ocr = {nombre: CacheOCR() for nombre in OCR_PROFILES}
+detector_placas: DetectorPlacas | None = None
+indice_placas = IndicePlacas(PLATE_FUZZY_MAX_DISTANCE)
+cache_consultas = CacheConsultas()
+almacen_imagenes = AlmacenImagenes()
+despachador_correos = DespachadorCorreos()
+
+# Duración en ms de cada fase del arranque; el OCR se carga en segundo plano.
+fases_arranque: dict[str, float] = {}
+error_carga_ocr: str | None = None
+tarea_carga_ocr: asyncio.Task | None = None
+
+
+def medir_fase(nombre: str, funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    fases_arranque[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+    print(f"[arranque] {nombre}: {fases_arranque[nombre]:.0f} ms")
+    return resultado
 
 
 @app.on_event("startup")
 def startup():
-    global ocr
-    Base.metadata.create_all(bind=engine)
-    cargar_perfiles_iniciales()
-    cargar_datos_iniciales()
-
-    ocr = PaddleOCR(
-        lang="en",
-        use_doc_orientation_classify=False,
-        use_doc_unwarping=False,
-        use_textline_orientation=False,
-    )
+    medir_fase("esquema", Base.metadata.create_all, engine)
+    medir_fase("migraciones", aplicar_migraciones, engine)
+    medir_fase("perfiles", cargar_perfiles_iniciales)
+    medir_fase("datos_iniciales", cargar_datos_iniciales)
+    medir_fase("indice_placas", cargar_indice_placas)
+
+
+@app.on_event("startup")
+async def iniciar_carga_ocr():
+    global tarea_carga_ocr
+    tarea_carga_ocr = asyncio.create_task(cargar_ocr())
+
+
+@app.on_event("startup")
+async def iniciar_correos():
+    despachador_correos.iniciar()
+
+
+async def cargar_ocr():
+    """Carga los modelos, los calienta con una placa sintética y hasta entonces habilita el OCR"""
+    global detector_placas, error_carga_ocr
+    try:
+        desconocidos = [nombre for nombre in OCR_PROFILES if nombre not in PERFILES_OCR]
+        if desconocidos:
+            raise ValueError(f"Perfiles OCR desconocidos: {', '.join(desconocidos)}")
+
+        if PLATE_DETECTOR_MODEL:
+            detector = await asyncio.to_thread(
+                medir_fase, "detector_placas", lambda: DetectorPlacas(
+                    PLATE_DETECTOR_MODEL,
+                    umbral=PLATE_DETECTOR_CONF,
+                    tam_entrada=PLATE_DETECTOR_IMGSZ,
+                    cpu_threads=OCR_CPU_THREADS,
+                ),
+            )
+            await asyncio.to_thread(medir_fase, "calentamiento_detector", detector.recortar, imagen_sintetica_placa())
+            detector_placas = detector
+
+        for nombre in OCR_PROFILES:
+            pool = await asyncio.to_thread(medir_fase, f"modelos_ocr_{nombre}", PoolOCR, PERFILES_OCR[nombre])
+            await asyncio.to_thread(medir_fase, f"calentamiento_ocr_{nombre}", pool.calentar, imagen_sintetica_placa())
+
+            loteador = LoteadorOCR(pool)
+            loteador.iniciar()
+            pools_ocr[nombre] = pool
+            loteadores_ocr[nombre] = loteador
+            print(f"[arranque] OCR listo (perfil {nombre})")
+    except Exception as e:
+        error_carga_ocr = str(e)
+        print(f"[arranque] Error cargando el OCR: {e}")
+
+
+@app.on_event("shutdown")
+async def detener_ocr():
+    if tarea_carga_ocr is not None and not tarea_carga_ocr.done():
+        tarea_carga_ocr.cancel()
+    for loteador in loteadores_ocr.values():
+        await loteador.detener()
+    for pool in pools_ocr.values():
+        pool.cerrar()
+    await despachador_correos.detener()
+    await async_engine.dispose()
 
 
 def cargar_perfiles_iniciales():
@@ -138,388 +270,618 @@ def cargar_datos_iniciales():
             },
         ]
 
+        # Un solo commit: la relación asigna persona_id al hacer flush.
         for item in datos:
             persona = Persona(**item["persona"])
+            persona.autos = [Auto(**auto_data) for auto_data in item.get("autos", [])]
             db.add(persona)
-            db.commit()
-            db.refresh(persona)
 
-            for auto_data in item.get("autos", []):
-                auto = Auto(**auto_data, persona_id=persona.id)
-                db.add(auto)
-
-            db.commit()
+        db.commit()
     finally:
         db.close()
 
 
-# ========== Helpers ==========
-
-def normalizar_placa(texto: str) -> str:
-    texto = texto.upper().strip()
-    texto = texto.replace(" ", "")
-    return texto
-
-def buscar_en_bd_por_placa_norm(placa_norm: str):
+def cargar_indice_placas():
     db = SessionLocal()
     try:
-        consulta = db.query(Auto).join(Persona).filter(Auto.placa == placa_norm).first()
-
-        if not consulta:
-            return None
-
-        respuesta = {
-            "persona": {
-                "id": consulta.persona.id,
-                "nombre": consulta.persona.nombre,
-                "edad": consulta.persona.edad,
-                "numeroControl": consulta.persona.numeroControl,
-                "correo": consulta.persona.correo,
-                "estatus": consulta.persona.estatus,
-                "noIncidencias": consulta.persona.noIncidencias,
-            },
-            "auto": {
-                "id": consulta.id,
-                "placa": consulta.placa,
-                "marca": consulta.marca,
-                "modelo": consulta.modelo,
-                "color": consulta.color,
-            },
-        }
-        return respuesta
+        indice_placas.reconstruir(placa for (placa,) in db.query(Auto.placa))
+        print(f"Índice de placas cargado: {len(indice_placas)} placas.")
     finally:
         db.close()
 
 
-def respuesta_persona_auto(persona: Persona, auto: Auto | None):
-    persona_dict = {
-        "id": persona.id,
-        "nombre": persona.nombre,
-        "edad": persona.edad,
-        "numeroControl": persona.numeroControl,
-        "correo": persona.correo,
-        "estatus": persona.estatus,
-        "noIncidencias": persona.noIncidencias,
-    }
+# ========== Helpers ==========
 
-    auto_dict = None
-    if auto is not None:
-        auto_dict = {
-            "id": auto.id,
-            "placa": auto.placa,
-            "marca": auto.marca,
-            "modelo": auto.modelo,
-            "color": auto.color,
-        }
+async def buscar_en_bd_por_placa_norm(placa_norm: str, db: AsyncSession | None = None):
+    clave = canonizar_placa(placa_norm)
+    return await cache_consultas.obtener(clave, lambda: consultar_placa(clave, db))
 
-    return {
-        "persona": persona_dict,
-        "auto": auto_dict,
-    }
 
+def consulta_placa(clave: str):
+    return select(Auto).options(joinedload(Auto.persona, innerjoin=True)).where(Auto.placa_clave == clave).limit(1)
 
-def respuesta_incidencia(incidencia: Incidencia):
-    incidencia_dict = {
-        "id": incidencia.id,
-        "descripcion": incidencia.descripcion,
-        "fecha": incidencia.fecha,
-        "hora": incidencia.hora or "",
-        "imagenes": json.loads(incidencia.imagenes) if incidencia.imagenes else [],
-        "estatus": incidencia.estatus,
-        "latitud": incidencia.latitud or "0", 
-        "longitud": incidencia.longitud or "0"  
-    }
-    
-    persona_afectada_dict = None 
-    if incidencia.persona_afectada is not None:
-        persona_afectada_dict = {
-            "id": incidencia.persona_afectada.id,
-            "nombre": incidencia.persona_afectada.nombre,
-            "edad": incidencia.persona_afectada.edad,
-            "numeroControl": incidencia.persona_afectada.numeroControl,
-            "correo": incidencia.persona_afectada.correo,
-            "estatus": incidencia.persona_afectada.estatus,
-            "noIncidencias": incidencia.persona_afectada.noIncidencias,
-        }
-    
-    reportante_dict = None
-    if incidencia.reportante is not None:
-        reportante_dict = {
-            "id": incidencia.reportante.id,
-            "nombre": incidencia.reportante.nombre,
-            "numeroControl": incidencia.reportante.numeroControl,
-            "correo": incidencia.reportante.correo,
-        }
-    
-    auto_dict = None
-    if incidencia.auto is not None:
-        auto_dict = {
-            "id": incidencia.auto.id,
-            "placa": incidencia.auto.placa,
-            "marca": incidencia.auto.marca,
-            "modelo": incidencia.auto.modelo,
-            "color": incidencia.auto.color,
-        }
-    
-    return {
-        "incidencia": incidencia_dict,
-        "persona_afectada": persona_afectada_dict,
-        "reportante": reportante_dict,
-        "auto": auto_dict,
-    }
 
+def datos_placa(consulta: Auto | None):
+    if not consulta:
+        return None
+    return PersonaAutoRead(persona=consulta.persona, auto=consulta).model_dump()
 
-@app.post("/ocr/placa")
-async def ocr_placa(file: UploadFile = File(...)):
-    global ocr
-    if ocr is None:
-        raise HTTPException(status_code=500, detail="OCR no inicializado")
 
-    try:
-        image_bytes = await file.read()
-        if not image_bytes:
-            raise ValueError("Imagen vacía")
+async def consultar_placa(clave: str, db: AsyncSession | None = None):
+    if db is not None:
+        return datos_placa(await db.scalar(consulta_placa(clave)))
+    async with AsyncSessionLocal() as db:
+        return datos_placa(await db.scalar(consulta_placa(clave)))
 
-        np_img = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("No se pudo decodificar la imagen (cv2.imdecode dio None)")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            temp_path = Path(tmp.name)
-            tmp.write(image_bytes)
+async def buscar_placa_o_cercanas(placa_norm: str, db: AsyncSession | None = None):
+    """Búsqueda exacta; si no hay match, las placas registradas más parecidas a la lectura"""
+    datos = await buscar_en_bd_por_placa_norm(placa_norm, db)
+    if datos is not None:
+        return datos, []
 
-        candidatos: list[tuple[str, float]] = []
+    cercanas = indice_placas.buscar(placa_norm, limite=PLATE_FUZZY_LIMIT)
+    return None, [{"placa": placa, "distancia": distancia} for placa, distancia in cercanas]
 
-        try:
-            results = ocr.predict(str(temp_path))
 
-            for res in results:
-                data = res.json
-                res_data = data.get("res", {})
-                rec_texts = res_data.get("rec_texts", []) or []
-                rec_scores = res_data.get("rec_scores", []) or []
+def respuesta_ocr(texto_crudo: str, placa_norm: str, mejor_score: float, datos, cercanas: list[dict],
+                  tiempos: dict[str, float] | None = None, cache: str | None = None,
+                  perfil: str | None = None) -> ResultadoOCR:
+    return ResultadoOCR(
+        ocr=LecturaOCR(
+            texto_crudo=texto_crudo, score=mejor_score, placa_normalizada=placa_norm, perfil=perfil, cache=cache,
+        ),
+        match_bd=datos,
+        coincidencias_cercanas=cercanas,
+        tiempos_ms={paso: round(ms, 2) for paso, ms in tiempos.items()} if tiempos is not None else None,
+    )
 
-                for t, s in zip(rec_texts, rec_scores):
-                    if t and s is not None:
-                        candidatos.append((str(t), float(s)))
-        finally:
+
+def leer_entrada_zip(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    """Descomprime un archivo del zip, sin pasar de IMAGE_MAX_BYTES"""
+    if info.file_size > IMAGE_MAX_BYTES:
+        raise ValueError(f"La imagen descomprimida pasa de {IMAGE_MAX_BYTES} bytes")
+    with zf.open(info) as entrada:
+        datos = entrada.read(IMAGE_MAX_BYTES + 1)
+    if len(datos) > IMAGE_MAX_BYTES:
+        raise ValueError(f"La imagen descomprimida pasa de {IMAGE_MAX_BYTES} bytes")
+    return datos
+
+
+async def leer_imagenes_lote(files: list[UploadFile]) -> list[tuple[str, Callable[[], bytes]]]:
+    """Imágenes de un multipart como (nombre, cargar); los .zip se expanden a sus archivos.
+
+    Los archivos de un zip no se descomprimen aquí: `cargar()` lee uno cuando el
+    OCR tiene lugar para él. Los zips se rechazan completos (413) si sus tamaños
+    declarados suman más de OCR_ZIP_MAX_BYTES o traen más de OCR_ZIP_MAX_FILES archivos.
+    """
+    imagenes: list[tuple[str, Callable[[], bytes]]] = []
+    total_zip = 0
+    archivos_zip = 0
+    for f in files:
+        contenido = await f.read()
+        nombre = f.filename or f"imagen_{len(imagenes)}"
+
+        if nombre.lower().endswith(".zip") or f.content_type in ("application/zip", "application/x-zip-compressed"):
             try:
-                temp_path.unlink(missing_ok=True)
-            except Exception:
-                pass
+                zf = zipfile.ZipFile(io.BytesIO(contenido))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Archivo zip inválido: {nombre}")
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                total_zip += info.file_size
+                archivos_zip += 1
+                if total_zip > OCR_ZIP_MAX_BYTES or archivos_zip > OCR_ZIP_MAX_FILES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Los zips pasan de {OCR_ZIP_MAX_FILES} archivos o {OCR_ZIP_MAX_BYTES} bytes descomprimidos",
+                    )
+                imagenes.append((info.filename, partial(leer_entrada_zip, zf, info)))
+        else:
+            imagenes.append((nombre, partial(bytes, contenido)))
+    return imagenes
+
+
+def paginar(consulta, columna_id, limit: int, after_id: int | None):
+    """Keyset por id: filas con id > after_id, una de más para saber si hay otra página"""
+    if after_id is not None:
+        consulta = consulta.where(columna_id > after_id)
+    return consulta.order_by(columna_id).limit(limit + 1)
+
+
+def pagina(filas, limit: int, response: Response) -> list:
+    """Recorta la fila de más y deja el cursor de la siguiente página en X-Next-After-Id"""
+    filas = list(filas)
+    if len(filas) > limit:
+        filas = filas[:limit]
+        response.headers["X-Next-After-Id"] = str(filas[-1].id)
+    return filas
+
+
+def resolver_imagenes(entradas: list[str]) -> list[str]:
+    """Referencias al almacén de las imágenes de una incidencia nueva.
+
+    Cada entrada es el hash devuelto por POST /imagenes o la imagen en base64
+    (que se guarda en el almacén aquí mismo). Cualquier otra cosa (p. ej. la ruta
+    local de la foto que mandaban versiones anteriores de la app) se rechaza con
+    422 y la lista de esas entradas, para que el cliente suba las fotos primero.
+    """
+    referencias = []
+    invalidas = []
+    for entrada in entradas:
+        if almacen_imagenes.existe(entrada):
+            referencias.append(entrada)
+            continue
+        datos = None if es_referencia(entrada) else decodificar_payload(entrada)
+        if datos is None:
+            invalidas.append(entrada[:80])
+            continue
+        referencias.append(almacen_imagenes.guardar(datos))
+    if invalidas:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Imágenes que no están en el almacén ni vienen en base64: {invalidas}",
+        )
+    return referencias
 
-        if not candidatos:
-            raise ValueError("No se pudo extraer texto de la placa")
 
-        placa_candidatos: list[tuple[str, str, float]] = []
+def loteador_para(perfil: str | None) -> tuple[str, LoteadorOCR]:
+    """Loteador del perfil pedido (o del perfil por defecto)"""
+    nombre = perfil or OCR_PROFILE
+    if nombre not in PERFILES_OCR:
+        raise HTTPException(status_code=400, detail=f"Perfil OCR desconocido: {nombre}")
+    if nombre not in OCR_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Perfil OCR no cargado en este servidor: {nombre}")
 
-        for text, score in candidatos:
-            norm = normalizar_placa(text)
+    loteador = loteadores_ocr.get(nombre)
+    if loteador is None:
+        raise HTTPException(status_code=503, detail="OCR no inicializado")
+    return nombre, loteador
 
-            if len(norm) < 5 or len(norm) > 10:
-                continue
 
-            tiene_num = any(c.isdigit() for c in norm)
-            tiene_letra = any(c.isalpha() for c in norm)
+async def reconocer_imagen(img: np.ndarray, loteador_ocr: LoteadorOCR) -> list[tuple[str, float]]:
+    """Corre el OCR sobre la imagen; con detector activo solo se reconocen los recortes de placa"""
+    if detector_placas is not None:
+        recortes = await run_in_threadpool(detector_placas.recortar, img)
+        if recortes:
+            resultados = await asyncio.gather(*(loteador_ocr.reconocer(r) for r in recortes))
+            candidatos = [c for res in resultados for c in res]
+            if candidatos:
+                return candidatos
 
-            if not (tiene_num and tiene_letra):
-                continue
+    # Sin detector, sin detecciones o sin texto en los recortes se usa el cuadro completo.
+    return await loteador_ocr.reconocer(img)
 
-            placa_candidatos.append((text, norm, score))
 
-        if placa_candidatos:
-            placa_candidatos.sort(key=lambda x: x[2], reverse=True)
-            texto_crudo, placa_norm, mejor_score = placa_candidatos[0]
-        else:
-            candidatos.sort(key=lambda x: x[1], reverse=True)
-            texto_crudo, mejor_score = candidatos[0]
-            placa_norm = normalizar_placa(texto_crudo)
+def _preparar_imagen(image_bytes: bytes, con_dhash: bool):
+    img, tiempos = preprocesar_imagen(image_bytes)
+    return img, tiempos, dhash(img) if con_dhash else None
 
-        datos = buscar_en_bd_por_placa_norm(placa_norm)
 
-        return {
-            "ocr": {
-                "texto_crudo": texto_crudo,
-                "score": mejor_score,
-                "placa_normalizada": placa_norm,
-            },
-            "match_bd": datos,
-        }
+async def candidatos_de_imagen(image_bytes: bytes, perfil: str,
+                               loteador_ocr: LoteadorOCR) -> tuple[list[tuple[str, float]], dict[str, float], str | None]:
+    """Candidatos de OCR de una imagen subida, pasando por el cache exacto y el perceptual del perfil.
+
+    Devuelve (candidatos, tiempos en ms, "exacto" | "similar" | None según el acierto de cache).
+    """
+    if not image_bytes:
+        raise ValueError("Imagen vacía")
+
+    cache_ocr = caches_ocr[perfil]
+    sha = hash_contenido(image_bytes) if cache_ocr.activo else None
+    if sha is not None:
+        candidatos = cache_ocr.buscar_exacto(sha)
+        if candidatos is not None:
+            return candidatos, {}, "exacto"
+
+    img, tiempos, h = await run_in_threadpool(_preparar_imagen, image_bytes, cache_ocr.similar_activo)
+    if h is not None:
+        candidatos = cache_ocr.buscar_similar(h)
+        if candidatos is not None:
+            cache_ocr.guardar(sha, h, candidatos)
+            return candidatos, tiempos, "similar"
+    cache_ocr.registrar_fallo()
+
+    # Se pasa el arreglo ya decodificado: una sola decodificación y sin archivos temporales.
+    # El loteador lo agrupa con otras peticiones concurrentes en un solo predict.
+    inicio = time.perf_counter()
+    candidatos = await reconocer_imagen(img, loteador_ocr)
+    tiempos["ocr"] = (time.perf_counter() - inicio) * 1000
+
+    if sha is not None and candidatos:
+        cache_ocr.guardar(sha, h, candidatos)
+    return candidatos, tiempos, None
+
+
+@app.post("/ocr/placa", response_model=ResultadoOCR)
+async def ocr_placa(file: UploadFile = File(...), perfil: str | None = None, db: AsyncSession = Depends(get_db)):
+    perfil, loteador_ocr = loteador_para(perfil)
+
+    try:
+        with OCR_EN_VUELO.track_inprogress():
+            inicio = time.perf_counter()
+            image_bytes = await file.read()
+            lectura = (time.perf_counter() - inicio) * 1000
+
+            candidatos, tiempos, cache = await candidatos_de_imagen(image_bytes, perfil, loteador_ocr)
+            tiempos["lectura"] = lectura
+
+            inicio = time.perf_counter()
+            texto_crudo, placa_norm, mejor_score = elegir_placa(candidatos)
+            tiempos["filtrado"] = (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            datos, cercanas = await buscar_placa_o_cercanas(placa_norm, db)
+            tiempos["bd"] = (time.perf_counter() - inicio) * 1000
+
+        registrar_etapas_ocr(tiempos)
+        return respuesta_ocr(texto_crudo, placa_norm, mejor_score, datos, cercanas, tiempos, cache, perfil)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error procesando la imagen: {e}")
 
 
-# ========== Rutas Persona ==========
+@app.post("/ocr/placas")
+async def ocr_placas(files: list[UploadFile] = File(...), perfil: str | None = None):
+    """Procesa muchas imágenes (o zips de imágenes) y devuelve un resultado NDJSON por imagen en cuanto está listo"""
+    perfil, loteador_ocr = loteador_para(perfil)
 
-@app.get("/personas")
-def listar_personas():
-    db = SessionLocal()
-    try:
-        personas = db.query(Persona).all()
-        return [
-            {
-                "id": p.id,
-                "nombre": p.nombre,
-                "edad": p.edad,
-                "numeroControl": p.numeroControl,
-                "correo": p.correo,
-                "estatus": p.estatus,
-                "noIncidencias": p.noIncidencias,
-            }
-            for p in personas
-        ]
-    finally:
-        db.close()
+    imagenes = await leer_imagenes_lote(files)
+    # Limita las imágenes descomprimidas y decodificadas en memoria a lo que el pool puede consumir.
+    max_en_vuelo = max(1, OCR_BATCH_SIZE * OCR_POOL_SIZE * 2)
 
+    async def reconocer(indice: int, nombre: str, cargar):
+        try:
+            image_bytes = await asyncio.to_thread(cargar)
+            with OCR_EN_VUELO.track_inprogress():
+                candidatos, tiempos, cache = await candidatos_de_imagen(image_bytes, perfil, loteador_ocr)
+                inicio = time.perf_counter()
+                placa = elegir_placa(candidatos)
+                tiempos["filtrado"] = (time.perf_counter() - inicio) * 1000
+            return indice, nombre, (*placa, tiempos, cache), None
+        except Exception as e:
+            return indice, nombre, None, str(e)
+
+    async def generar():
+        # La sesión se abre aquí y no como dependencia: vive lo que dure el stream.
+        db = AsyncSessionLocal()
+        pendientes: set[asyncio.Task] = set()
+
+        async def lineas(hechas):
+            for tarea in hechas:
+                indice, nombre, placa, error = tarea.result()
+                linea = {"indice": indice, "archivo": nombre}
+                if error is not None:
+                    linea["error"] = f"Error procesando la imagen: {error}"
+                else:
+                    texto_crudo, placa_norm, mejor_score, tiempos, cache = placa
+                    inicio = time.perf_counter()
+                    datos, cercanas = await buscar_placa_o_cercanas(placa_norm, db)
+                    tiempos["bd"] = (time.perf_counter() - inicio) * 1000
+                    registrar_etapas_ocr(tiempos)
+                    linea.update(respuesta_ocr(
+                        texto_crudo, placa_norm, mejor_score, datos, cercanas, tiempos, cache, perfil
+                    ).model_dump(mode="json"))
+                yield json.dumps(linea, ensure_ascii=False) + "\n"
 
-@app.get("/personas/{persona_id}/autos")
-def listar_autos_de_persona(persona_id: int):
-    db = SessionLocal()
+        try:
+            for indice, (nombre, cargar) in enumerate(imagenes):
+                if len(pendientes) >= max_en_vuelo:
+                    hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                    async for linea in lineas(hechas):
+                        yield linea
+                pendientes.add(asyncio.create_task(reconocer(indice, nombre, cargar)))
+
+            while pendientes:
+                hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                async for linea in lineas(hechas):
+                    yield linea
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+            await db.close()
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
+
+
+@app.websocket("/ocr/stream")
+async def ocr_stream(websocket: WebSocket, perfil: str | None = None):
+    """Recibe cuadros JPEG (mensajes binarios) de una cámara y envía un evento por cada placa estable registrada.
+
+    Si el OCR va más lento que la cámara solo se procesa el cuadro más reciente;
+    los cuadros casi iguales al último procesado no pasan por el OCR (solo mantienen
+    vigente su lectura), pero cada STREAM_SKIP_MAX_S se vuelve a leer aunque no cambien.
+    """
+    await websocket.accept()
     try:
-        persona = db.query(Persona).filter(Persona.id == persona_id).first()
-        if not persona:
-            raise HTTPException(status_code=404, detail="Persona no encontrada")
-
-        autos = (
-            db.query(Auto)
-            .filter(Auto.persona_id == persona.id)
-            .all()
-        )
+        perfil, loteador_ocr = loteador_para(perfil)
+    except HTTPException as e:
+        await websocket.close(code=1013 if e.status_code == 503 else 1008, reason=e.detail)
+        return
+
+    votacion = VotacionPlacas()
+    ultimo_cuadro: list[bytes | None] = [None]
+    hay_cuadro = asyncio.Event()
+
+    async def recibir():
+        while True:
+            mensaje = await websocket.receive()
+            if mensaje["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(mensaje.get("code", 1000))
+            if mensaje.get("bytes"):
+                ultimo_cuadro[0] = mensaje["bytes"]
+                hay_cuadro.set()
+
+    async def procesar():
+        ultimo_hash: int | None = None
+        ultimo_ocr = 0.0
+        while True:
+            await hay_cuadro.wait()
+            hay_cuadro.clear()
+            cuadro, ultimo_cuadro[0] = ultimo_cuadro[0], None
+            if cuadro is None:
+                continue
 
-        return [
-            {
-                "id": a.id,
-                "placa": a.placa,
-                "marca": a.marca,
-                "modelo": a.modelo,
-                "color": a.color,
-            }
-            for a in autos
-        ]
-    finally:
-        db.close()
+            try:
+                img, _, h = await run_in_threadpool(_preparar_imagen, cuadro, True)
+            except ValueError:
+                continue
+            # Un cuadro casi igual al último leído no es una lectura nueva: solo la refresca.
+            # Pasado STREAM_SKIP_MAX_S se lee de todos modos (el dHash del cuadro completo
+            # puede no ver que cambió la placa, y un auto detenido necesita varias lecturas).
+            if (ultimo_hash is not None and (h ^ ultimo_hash).bit_count() <= STREAM_SKIP_DISTANCE
+                    and time.monotonic() - ultimo_ocr < STREAM_SKIP_MAX_S):
+                votacion.refrescar()
+                continue
+            ultimo_hash = h
+            ultimo_ocr = time.monotonic()
+
+            with OCR_EN_VUELO.track_inprogress():
+                candidatos = await reconocer_imagen(img, loteador_ocr)
+            if not candidatos:
+                continue
+            _, placa_norm, score = elegir_placa(candidatos)
+            if not parece_placa(placa_norm):
+                continue
 
+            estable = votacion.agregar(placa_norm, score)
+            if estable is None:
+                continue
 
-@app.post("/personas/agregar", response_model=PersonaRead, status_code=201)
-def añadir_persona(persona: PersonaCreate):
-    db = SessionLocal()
+            datos = await buscar_en_bd_por_placa_norm(estable["placa"])
+            if datos is None:
+                continue
+            await websocket.send_json({"evento": "placa", **estable, "match_bd": datos})
+
+    tareas = [asyncio.create_task(recibir()), asyncio.create_task(procesar())]
     try:
-        nueva_persona = Persona(
-            nombre=persona.nombre,
-            edad=persona.edad,
-            numeroControl=persona.numeroControl,
-            correo=persona.correo,
-        )
-        db.add(nueva_persona)
-        db.commit()
-        db.refresh(nueva_persona)
-        return nueva_persona  
+        hechas, _ = await asyncio.wait(tareas, return_when=asyncio.FIRST_COMPLETED)
+        for tarea in hechas:
+            error = tarea.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
     finally:
-        db.close()
+        for tarea in tareas:
+            tarea.cancel()
+
+
+@app.get("/ocr/cache")
+def estadisticas_cache_ocr():
+    return {nombre: cache.estadisticas() for nombre, cache in caches_ocr.items()}
+
+
+@app.get("/ocr/perfiles")
+def listar_perfiles_ocr():
+    return [
+        {
+            "nombre": perfil.nombre,
+            "descripcion": perfil.descripcion,
+            "modelo_det": perfil.modelo_det,
+            "modelo_rec": perfil.modelo_rec,
+            "solo_reconocimiento": perfil.solo_reconocimiento,
+            "por_defecto": perfil.nombre == OCR_PROFILE,
+            "cargado": perfil.nombre in loteadores_ocr,
+        }
+        for perfil in PERFILES_OCR.values()
+    ]
 
 
-@app.post("/personas/{persona_id}/autos", response_model=AutoRead, status_code=201)
-def crear_auto_para_persona(persona_id: int, auto: AutoCreate):
-    db = SessionLocal()
-    try:
-        persona = db.query(Persona).filter(Persona.id == persona_id).first()
-        if not persona:
-            raise HTTPException(status_code=404, detail="Persona no encontrada")
-
-        nuevo_auto = Auto(
-            placa=auto.placa,
-            marca=auto.marca,
-            modelo=auto.modelo,
-            color=auto.color,
-            persona_id=persona.id,
-        )
+# ========== Salud ==========
 
-        db.add(nuevo_auto)
-        db.commit()
-        db.refresh(nuevo_auto)
-
-        return AutoRead(
-            id=nuevo_auto.id,
-            placa=nuevo_auto.placa,
-            marca=nuevo_auto.marca,
-            modelo=nuevo_auto.modelo,
-            color=nuevo_auto.color,
-            personaId=nuevo_auto.persona_id,
-        )
+@app.get("/metrics")
+def metricas():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-    finally:
-        db.close()
 
+@app.get("/health/live")
+def salud_vivo():
+    return {"estado": "vivo"}
 
-@app.delete("/personas/{persona_id}")
-def eliminar_persona(persona_id: int):
-    db = SessionLocal()
+
+@app.get("/health/ready")
+async def salud_listo():
+    bd_ok = True
     try:
-        persona = db.query(Persona).filter(Persona.id == persona_id).first()
-        if not persona:
-            raise HTTPException(status_code=404, detail="Persona no encontrada")
-        db.delete(persona)
-        db.commit()
-        return {"detail": "Persona eliminada exitosamente"}
-    finally:
-        db.close()
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception:
+        bd_ok = False
+
+    ocr_ok = all(nombre in loteadores_ocr for nombre in OCR_PROFILES)
+    listo = bd_ok and ocr_ok
+    cuerpo = {
+        "estado": "listo" if listo else "no_listo",
+        "bd": bd_ok,
+        "ocr": ocr_ok,
+        "perfiles_ocr": sorted(loteadores_ocr),
+        "error_ocr": error_carga_ocr,
+        "fases_ms": fases_arranque,
+    }
+    return JSONResponse(cuerpo, status_code=200 if listo else 503)
 
 
-@app.get("/personas/{persona_id}/detalle")
-def obtener_detalle_persona(persona_id: int):
-    db = SessionLocal()
-    try:
-        persona = db.query(Persona).filter(Persona.id == persona_id).first()
-        if not persona:
-            raise HTTPException(status_code=404, detail="Persona no encontrada")
+@app.get("/correos/estado")
+async def estado_correos():
+    """Correos de la bandeja de salida por estado (pendiente, enviado, fallido)"""
+    return await despachador_correos.estadisticas()
 
-        auto = db.query(Auto).filter(Auto.persona_id == persona.id).first()
 
-        return respuesta_persona_auto(persona, auto)
+# ========== Rutas Persona ==========
 
-    finally:
-        db.close()
+@app.get("/personas", response_model=list[PersonaResumen])
+async def listar_personas(
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after_id: int | None = None,
+    estatus: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    consulta = select(Persona)
+    if estatus is not None:
+        consulta = consulta.where(Persona.estatus == estatus)
+
+    return pagina(await db.scalars(paginar(consulta, Persona.id, limit, after_id)), limit, response)
+
+
+@app.get("/personas/{persona_id}/autos", response_model=list[AutoResumen])
+async def listar_autos_de_persona(persona_id: int, db: AsyncSession = Depends(get_db)):
+    persona = await db.get(Persona, persona_id)
+    if not persona:
+        raise HTTPException(status_code=404, detail="Persona no encontrada")
+
+    return await db.scalars(
+        select(Auto)
+        .where(Auto.persona_id == persona.id)
+    )
 
-@app.get("/personas/{numero_control}", response_model=PersonaRead)
-def obtener_persona_por_numero_control(numero_control: str):
-    db = SessionLocal()
-    try:
-        persona = db.query(Persona).filter(Persona.numeroControl == numero_control).first()
-        if persona is None:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        return persona
-    finally:
-        db.close()
 
+@app.post("/personas/agregar", response_model=PersonaRead, status_code=201)
+async def añadir_persona(persona: PersonaCreate, db: AsyncSession = Depends(get_db)):
+    nueva_persona = Persona(
+        nombre=persona.nombre,
+        edad=persona.edad,
+        numeroControl=persona.numeroControl,
+        correo=persona.correo,
+    )
+    db.add(nueva_persona)
+    await db.commit()
+    await db.refresh(nueva_persona)
+    return nueva_persona
 
 
-# ========== Rutas Auto ==========
+@app.post("/personas/{persona_id}/autos", response_model=AutoRead, status_code=201)
+async def crear_auto_para_persona(persona_id: int, auto: AutoCreate, db: AsyncSession = Depends(get_db)):
+    persona = await db.get(Persona, persona_id)
+    if not persona:
+        raise HTTPException(status_code=404, detail="Persona no encontrada")
+
+    nuevo_auto = Auto(
+        placa=auto.placa,
+        marca=auto.marca,
+        modelo=auto.modelo,
+        color=auto.color,
+        persona_id=persona.id,
+    )
 
-@app.get("/autos")
-def listar_autos():
-    db = SessionLocal()
+    # Las placas son únicas por su forma canónica: "abc 123 a" choca con "ABC-123-A".
+    existente = await db.scalar(select(Auto.placa).where(Auto.placa_clave == nuevo_auto.placa_clave))
+    if existente is not None:
+        raise HTTPException(status_code=409, detail=f"La placa ya está registrada como {existente}")
+
+    db.add(nuevo_auto)
     try:
-        autos = db.query(Auto).all()
-        return [
-            {
-                "id": a.id,
-                "placa": a.placa,
-                "marca": a.marca,
-                "modelo": a.modelo,
-                "color": a.color,
-                "personaId": a.persona_id,
-            }
-            for a in autos
-        ]
-    finally:
-        db.close()
+        await db.commit()
+    except IntegrityError:
+        # Otra petición registró la misma placa entre la consulta y el commit.
+        await db.rollback()
+        existente = await db.scalar(select(Auto.placa).where(Auto.placa_clave == canonizar_placa(auto.placa)))
+        raise HTTPException(status_code=409, detail=f"La placa ya está registrada como {existente or auto.placa}")
+    await db.refresh(nuevo_auto)
+    indice_placas.agregar(nuevo_auto.placa)
+    cache_consultas.invalidar_placa(nuevo_auto.placa_clave)
+
+    return nuevo_auto
+
+
+@app.post("/personas/importar", response_model=ImportacionResultado)
+async def importar_personas(
+    archivo: UploadFile = File(...),
+    formato: str | None = Query(None, pattern="^(ndjson|csv)$"),
+):
+    """Alta/actualización masiva de personas y autos (ver `bulkImport`); las filas con error se reportan"""
+    # Se decodifica desde bytes: en Python 3.10 el SpooledTemporaryFile de la subida no se puede envolver
+    # con TextIOWrapper (le faltan readable/seekable).
+    try:
+        texto = io.StringIO((await archivo.read()).decode("utf-8-sig"), newline="")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar en UTF-8")
+    resultado = await run_in_threadpool(
+        importar_archivo, engine, texto, formato or formato_por_nombre(archivo.filename)
+    )
+
+    cache_consultas.limpiar()
+    await run_in_threadpool(cargar_indice_placas)
+    return resultado
 
 
-@app.get("/autos/placa/{placa}")
-def buscar_datos_por_placa(placa: str):
+@app.delete("/personas/{persona_id}")
+async def eliminar_persona(persona_id: int, db: AsyncSession = Depends(get_db)):
+    persona = await db.get(Persona, persona_id, options=[selectinload(Persona.autos)])
+    if not persona:
+        raise HTTPException(status_code=404, detail="Persona no encontrada")
+    placas = [a.placa for a in persona.autos]
+    await db.delete(persona)
+    await db.commit()
+    for placa in placas:
+        indice_placas.quitar(placa)
+        cache_consultas.invalidar_placa(canonizar_placa(placa))
+    cache_consultas.invalidar_persona(persona_id)
+    return {"detail": "Persona eliminada exitosamente"}
+
+
+@app.get("/personas/{persona_id}/detalle", response_model=PersonaAutoRead)
+async def obtener_detalle_persona(persona_id: int, db: AsyncSession = Depends(get_db)):
+    persona = await db.get(Persona, persona_id)
+    if not persona:
+        raise HTTPException(status_code=404, detail="Persona no encontrada")
+
+    auto = await db.scalar(select(Auto).where(Auto.persona_id == persona.id).limit(1))
+
+    return PersonaAutoRead(persona=persona, auto=auto)
+
+@app.get("/personas/{numero_control}", response_model=PersonaRead)
+async def obtener_persona_por_numero_control(numero_control: str, db: AsyncSession = Depends(get_db)):
+    persona = await db.scalar(select(Persona).where(Persona.numeroControl == numero_control))
+    if persona is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return persona
+
+
+
+# ========== Rutas Auto ==========
+
+@app.get("/autos", response_model=list[AutoRead])
+async def listar_autos(
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after_id: int | None = None,
+    personaId: int | None = None,
+    placa: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    consulta = select(Auto)
+    if personaId is not None:
+        consulta = consulta.where(Auto.persona_id == personaId)
+    if placa is not None:
+        consulta = consulta.where(Auto.placa_clave == canonizar_placa(placa))
+
+    return pagina(await db.scalars(paginar(consulta, Auto.id, limit, after_id)), limit, response)
+
+
+@app.get("/autos/placa/{placa}", response_model=PersonaAutoRead)
+async def buscar_datos_por_placa(placa: str, db: AsyncSession = Depends(get_db)):
     placa_norm = normalizar_placa(placa)
-    datos = buscar_en_bd_por_placa_norm(placa_norm)
+    datos = await buscar_en_bd_por_placa_norm(placa_norm, db)
 
     if not datos:
         raise HTTPException(status_code=404, detail="Placa no registrada")
@@ -527,97 +889,159 @@ def buscar_datos_por_placa(placa: str):
     return datos
 
 
+@app.get("/autos/cache")
+def estadisticas_cache_consultas():
+    return cache_consultas.estadisticas()
+
+
 @app.delete("/autos/{auto_id}")
-def eliminar_auto(auto_id: int):
-    db = SessionLocal()
+async def eliminar_auto(auto_id: int, db: AsyncSession = Depends(get_db)):
+    auto = await db.get(Auto, auto_id)
+    if not auto:
+        raise HTTPException(status_code=404, detail="Auto no encontrado")
+    placa = auto.placa
+    await db.delete(auto)
+    await db.commit()
+    indice_placas.quitar(placa)
+    cache_consultas.invalidar_placa(canonizar_placa(placa))
+    return {"detail": "Auto eliminado exitosamente"}
+
+
+# ========== Rutas Imagen ==========
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+
+@app.post("/imagenes", status_code=201)
+async def subir_imagenes(files: list[UploadFile] = File(...)):
+    """Guarda fotos de evidencia en el almacén; las referencias se mandan luego en `imagenes` de la incidencia"""
+    subidas = []
+    for f in files:
+        datos = await f.read(IMAGE_MAX_BYTES + 1)
+        if len(datos) > IMAGE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Imagen demasiado grande: {f.filename}")
+        try:
+            sha = await run_in_threadpool(almacen_imagenes.guardar, datos)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Imagen inválida ({f.filename}): {e}")
+        subidas.append({"id": sha, "url": f"/imagenes/{sha}", "miniatura": f"/imagenes/{sha}/miniatura"})
+    return subidas
+
+
+@app.get("/imagenes/{sha}")
+def descargar_imagen(sha: str, request: Request):
+    """Imagen original en streaming, con soporte de Range y ETag"""
+    if not almacen_imagenes.existe(sha):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    encabezados = {"Accept-Ranges": "bytes", "ETag": f'"{sha}"', "Cache-Control": CACHE_INMUTABLE}
+    if request.headers.get("if-none-match") == encabezados["ETag"]:
+        return Response(status_code=304, headers=encabezados)
+
+    tamano = almacen_imagenes.ruta(sha).stat().st_size
     try:
-        auto = db.query(Auto).filter(Auto.id == auto_id).first()
-        if not auto:
-            raise HTTPException(status_code=404, detail="Auto no encontrado")
-        db.delete(auto)
-        db.commit()
-        return {"detail": "Auto eliminado exitosamente"}
-    finally:
-        db.close()
+        rango = rango_bytes(request.headers.get("range"), tamano)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{tamano}"})
+
+    inicio, fin, estatus = 0, tamano - 1, 200
+    if rango is not None:
+        (inicio, fin), estatus = rango, 206
+        encabezados["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+    encabezados["Content-Length"] = str(fin - inicio + 1)
+
+    return StreamingResponse(
+        almacen_imagenes.leer(sha, inicio, fin),
+        status_code=estatus,
+        media_type=almacen_imagenes.tipo_contenido(sha),
+        headers=encabezados,
+    )
+
+
+@app.get("/imagenes/{sha}/miniatura")
+def descargar_miniatura(sha: str):
+    if not almacen_imagenes.existe(sha):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    return FileResponse(
+        almacen_imagenes.miniatura(sha),
+        media_type="image/jpeg",
+        headers={"ETag": f'"{sha}-miniatura"', "Cache-Control": CACHE_INMUTABLE},
+    )
 
 
 # ========== Rutas Incidencia ==========
 
+def consulta_incidencias():
+    return select(Incidencia).options(
+        joinedload(Incidencia.persona_afectada),
+        joinedload(Incidencia.reportante),
+        joinedload(Incidencia.auto)
+    )
 
-@app.get("/incidencias")
-def listar_incidencias(personaId: int):
-    db = SessionLocal()
-    try:
-        persona = db.query(Persona).filter(Persona.id == personaId).first()
-        if not persona:
-            raise HTTPException(status_code=404, detail="Persona no encontrada")
-        
-        base_query = db.query(Incidencia).options(
-            joinedload(Incidencia.persona_afectada),
-            joinedload(Incidencia.reportante),
-            joinedload(Incidencia.auto)
+
+def filtrar_incidencias(consulta, estatus: str | None, desde: date | None, hasta: date | None):
+    if estatus is not None:
+        consulta = consulta.where(Incidencia.estatus == estatus)
+    if desde is not None:
+        consulta = consulta.where(Incidencia.fecha_hora >= datetime.combine(desde, datetime.min.time()))
+    if hasta is not None:
+        consulta = consulta.where(Incidencia.fecha_hora < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+    return consulta
+
+
+@app.get("/incidencias", response_model=list[IncidenciaListItem])
+async def listar_incidencias(
+    personaId: int,
+    response: Response,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    after_id: int | None = None,
+    estatus: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    personaAfectadaId: int | None = None,
+    placa: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Incidencias visibles para `personaId` (un Usuario solo ve las que reportó), por páginas y con filtros.
+
+    `desde` y `hasta` son días inclusivos y se comparan contra `fecha_hora` (índice con `estatus`).
+    """
+    persona = await db.get(Persona, personaId, options=[joinedload(Persona.perfil)])
+    if not persona:
+        raise HTTPException(status_code=404, detail="Persona no encontrada")
+
+    base_query = consulta_incidencias()
+
+    if persona.perfil.nombre == 'Usuario':
+        base_query = base_query.where(Incidencia.reportante_id == personaId)
+    base_query = filtrar_incidencias(base_query, estatus, desde, hasta)
+    if personaAfectadaId is not None:
+        base_query = base_query.where(Incidencia.persona_id == personaAfectadaId)
+    if placa is not None:
+        base_query = base_query.where(
+            Incidencia.auto_id.in_(select(Auto.id).where(Auto.placa_clave == canonizar_placa(placa)))
         )
-        
-        if persona.perfil.nombre == 'Usuario':
-            incidencias = base_query.filter(Incidencia.reportante_id == personaId).all()
-        else:
-            incidencias = base_query.all()
 
-        return [
-            {
-                "id": inc.id,
-                "descripcion": inc.descripcion or "",  
-                "fecha": inc.fecha or "", 
-                "hora": inc.hora or "",
-                "imagenes": json.loads(inc.imagenes) if inc.imagenes else [],
-                "estatus": inc.estatus or "Pendiente",  
-                "latitud": inc.latitud or "0",  
-                "longitud": inc.longitud or "0",  
-                "persona_afectada": {
-                    "id": inc.persona_afectada.id,
-                    "nombre": inc.persona_afectada.nombre or "",  
-                    "numeroControl": inc.persona_afectada.numeroControl or "",  
-                    "correo": inc.persona_afectada.correo or "",  
-                    "estatus": inc.persona_afectada.estatus or "Autorizado",  
-                    "noIncidencias": inc.persona_afectada.noIncidencias or 0  
-                } if inc.persona_afectada else None,
-                "reportante": {
-                    "id": inc.reportante.id,
-                    "nombre": inc.reportante.nombre or "", 
-                    "numeroControl": inc.reportante.numeroControl or "",  
-                    "correo": inc.reportante.correo or "" 
-                } if inc.reportante else None,
-                "auto": {
-                    "id": inc.auto.id,
-                    "placa": inc.auto.placa or "",  
-                    "marca": inc.auto.marca or "",  
-                    "modelo": inc.auto.modelo or "",  
-                    "color": inc.auto.color or ""
-                } if inc.auto else None
-            }
-            for inc in incidencias
-        ]
-    finally:
-        db.close()
+    return pagina(await db.scalars(paginar(base_query, Incidencia.id, limit, after_id)), limit, response)
 
 
-@app.post("/incidencias/agregar", status_code=201)
-def añadir_incidencia(incidencia: IncidenciaCreate):
-    db = SessionLocal()
+@app.post("/incidencias/agregar", response_model=IncidenciaRead, status_code=201)
+async def añadir_incidencia(incidencia: IncidenciaCreate, db: AsyncSession = Depends(get_db)):
     try:
-        persona_afectada = db.query(Persona).filter(Persona.id == incidencia.personaId).first()
+        persona_afectada = await db.get(Persona, incidencia.personaId)
         if not persona_afectada:
             raise HTTPException(status_code=404, detail="Persona afectada no encontrada")
         
-        reportante = db.query(Persona).filter(Persona.id == incidencia.reportanteId).first()
+        reportante = await db.get(Persona, incidencia.reportanteId)
         if not reportante:
             raise HTTPException(status_code=404, detail="Reportante no encontrado")
 
-        auto = db.query(Auto).filter(Auto.id == incidencia.autoId).first()
+        auto = await db.get(Auto, incidencia.autoId)
         if not auto:
             raise HTTPException(status_code=404, detail="Auto no encontrado")
         
-        imagenes_str = json.dumps(incidencia.imagenes) if incidencia.imagenes else "[]"
+        referencias = await run_in_threadpool(resolver_imagenes, incidencia.imagenes or [])
+        imagenes_str = json.dumps(referencias)
         
         latitud = incidencia.latitud if incidencia.latitud is not None else "0"
         longitud = incidencia.longitud if incidencia.longitud is not None else "0"
@@ -635,73 +1059,97 @@ def añadir_incidencia(incidencia: IncidenciaCreate):
             auto_id=incidencia.autoId,
         )
         db.add(nueva_incidencia)
-        db.commit()
-        db.refresh(nueva_incidencia)
+        await db.commit()
+        await db.refresh(nueva_incidencia)
         
-        return IncidenciaRead(
-            id=nueva_incidencia.id,
-            descripcion=nueva_incidencia.descripcion,
-            fecha=nueva_incidencia.fecha,
-            hora=nueva_incidencia.hora,
-            imagenes=json.loads(nueva_incidencia.imagenes) if nueva_incidencia.imagenes else [],
-            estatus=nueva_incidencia.estatus,
-            latitud=nueva_incidencia.latitud,
-            longitud=nueva_incidencia.longitud,
-            personaId=nueva_incidencia.persona_id,
-            reportanteId=nueva_incidencia.reportante_id,
-            autoId=nueva_incidencia.auto_id,
-        )
+        return nueva_incidencia
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error creando incidencia: {str(e)}")
-    finally:
-        db.close()
 
 
 @app.delete("/incidencias/{incidencia_id}")
-def eliminar_incidencia(incidencia_id: int):
-    db = SessionLocal()
-    try:
-        incidencia = db.query(Incidencia).filter(Incidencia.id == incidencia_id).first()
-        if not incidencia:
-            raise HTTPException(status_code=404, detail="Incidencia no encontrada")
-        db.delete(incidencia)
-        db.commit()
-        return {"detail": "Incidencia eliminada exitosamente"}
-    finally:
-        db.close()
+async def eliminar_incidencia(incidencia_id: int, db: AsyncSession = Depends(get_db)):
+    incidencia = await db.get(Incidencia, incidencia_id)
+    if not incidencia:
+        raise HTTPException(status_code=404, detail="Incidencia no encontrada")
+    await db.delete(incidencia)
+    await db.commit()
+    return {"detail": "Incidencia eliminada exitosamente"}
+
+
+@app.get("/incidencias/{incidencia_id}/detalle", response_model=IncidenciaDetalle)
+async def obtener_detalle_incidencia(incidencia_id: int, db: AsyncSession = Depends(get_db)):
+    incidencia = await db.scalar(consulta_incidencias().where(Incidencia.id == incidencia_id))
+    
+    if not incidencia:
+        raise HTTPException(status_code=404, detail="Incidencia no encontrada")
+
+    return incidencia
+
+
+async def transicionar_incidencias(db: AsyncSession, decisiones: dict[int, str]) -> list:
+    """UPDATE condicional de estatus ({id: estatus}): solo cambian las incidencias que no lo tenían ya.
+
+    Devuelve (id, persona_id, reportante_id) de las que sí cambiaron. Dos admins
+    aprobando la misma incidencia a la vez: el segundo UPDATE espera el candado de
+    la fila, vuelve a evaluar el WHERE y ya no la toca, así que no se cuenta doble.
+    Las filas se bloquean antes en orden de id y todas las decisiones van en un
+    solo UPDATE, para que dos revisiones masivas que se cruzan no se bloqueen mutuamente.
+    """
+    ids = sorted(decisiones)
+    await db.execute(select(Incidencia.id).where(Incidencia.id.in_(ids)).order_by(Incidencia.id).with_for_update())
+    estatus = case(decisiones, value=Incidencia.id)
+    filas = await db.execute(
+        update(Incidencia)
+        .where(Incidencia.id.in_(ids), Incidencia.estatus.is_distinct_from(estatus))
+        .values(estatus=estatus)
+        .returning(Incidencia.id, Incidencia.persona_id, Incidencia.reportante_id)
+        .execution_options(synchronize_session=False)
+    )
+    return filas.all()
+
+
+def es_conflicto_concurrencia(error: DBAPIError) -> bool:
+    """Deadlock (40P01) o falla de serialización (40001) de Postgres: la transacción se puede reintentar"""
+    codigo = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    return codigo in ("40P01", "40001")
+
+
+async def sumar_incidencias(db: AsyncSession, conteos: dict[int, int]) -> dict[int, tuple[int, str]]:
+    """Suma las aprobaciones a cada persona y la bloquea al llegar a 3, en un solo UPDATE ... RETURNING.
+
+    El incremento lo hace la BD sobre el valor vigente de la fila (no un
+    leer-sumar-escribir en Python), así que no se pierden aprobaciones concurrentes.
+    Las personas se bloquean en orden de id, igual que las incidencias.
+    Devuelve {persona_id: (noIncidencias, estatus)} ya actualizados.
+    """
+    await db.execute(select(Persona.id).where(Persona.id.in_(conteos)).order_by(Persona.id).with_for_update())
+    total = func.coalesce(Persona.noIncidencias, 0) + case(conteos, value=Persona.id, else_=0)
+    filas = await db.execute(
+        update(Persona)
+        .where(Persona.id.in_(conteos))
+        .values(noIncidencias=total, estatus=case((total >= 3, "Bloqueado"), else_=Persona.estatus))
+        .returning(Persona.id, Persona.noIncidencias, Persona.estatus)
+        .execution_options(synchronize_session=False)
+    )
+    return {persona_id: (numero, estatus) for persona_id, numero, estatus in filas}
 
 
-@app.get("/incidencias/{incidencia_id}/detalle")
-def obtener_detalle_incidencia(incidencia_id: int):
-    db = SessionLocal()
+@app.patch(
+    "/incidencias/{incidencia_id}/estatus", response_model=EstatusIncidenciaResultado, response_model_exclude_none=True
+)
+async def actualizar_estatus_incidencia(incidencia_id: int, estatus: str, db: AsyncSession = Depends(get_db)):
     try:
-        incidencia = db.query(Incidencia).options(
-            joinedload(Incidencia.persona_afectada),
-            joinedload(Incidencia.reportante),
-            joinedload(Incidencia.auto)
-        ).filter(Incidencia.id == incidencia_id).first()
-        
-        if not incidencia:
-            raise HTTPException(status_code=404, detail="Incidencia no encontrada")
-
-        return respuesta_incidencia(incidencia)
+        cambio = await transicionar_incidencias(db, {incidencia_id: estatus})
+        if cambio and estatus == "Aprobada":
+            await sumar_incidencias(db, {cambio[0].persona_id: 1})
 
-    finally:
-        db.close()
-
-
-@app.patch("/incidencias/{incidencia_id}/estatus")
-def actualizar_estatus_incidencia(incidencia_id: int, estatus: str):
-    db = SessionLocal()
-    try:
-        incidencia = db.query(Incidencia).options(
-            joinedload(Incidencia.persona_afectada),
-            joinedload(Incidencia.reportante),
-            joinedload(Incidencia.auto)
-        ).filter(Incidencia.id == incidencia_id).first()
+        incidencia = await db.scalar(
+            consulta_incidencias().where(Incidencia.id == incidencia_id).execution_options(populate_existing=True)
+        )
         
         if not incidencia:
             raise HTTPException(status_code=404, detail="Incidencia no encontrada")
@@ -713,20 +1161,12 @@ def actualizar_estatus_incidencia(incidencia_id: int, estatus: str):
         if not persona_afectada or not auto or not reportante:
             raise HTTPException(status_code=404, detail="Datos relacionados no encontrados")
 
-        incidencia.estatus = estatus
-        
         if estatus == "Aprobada":
-            persona_afectada.noIncidencias += 1
-            
-            if persona_afectada.noIncidencias >= 3:
-                persona_afectada.estatus = "Bloqueado"
-            
-            db.commit()
-            
-            try:
-                enviar_correo_persona_afectada(
+            if cambio:
+                # Los correos se insertan en la misma transacción: si el commit falla no se manda nada,
+                # y si el proveedor falla el worker los reintenta.
+                encolar_correo(db, persona_afectada.correo, *correo_persona_afectada(
                     nombre=persona_afectada.nombre,
-                    email=persona_afectada.correo,
                     numero_incidencias=persona_afectada.noIncidencias,
                     fecha=incidencia.fecha,
                     hora=incidencia.hora,
@@ -735,14 +1175,8 @@ def actualizar_estatus_incidencia(incidencia_id: int, estatus: str):
                     modelo=auto.modelo,
                     placa=auto.placa,
                     incidencia_id=incidencia.id
-                )
-                print(f"Correo enviado a persona afectada: {persona_afectada.correo}")
-            except Exception as e:
-                print(f"Error enviando correo a persona afectada: {e}")
-            
-            try:
-                enviar_correo_reportante(
-                    email_reportante=reportante.correo,
+                ))
+                encolar_correo(db, reportante.correo, *correo_reportante(
                     incidencia_id=incidencia.id,
                     fecha=incidencia.fecha,
                     hora=incidencia.hora,
@@ -750,70 +1184,238 @@ def actualizar_estatus_incidencia(incidencia_id: int, estatus: str):
                     marca=auto.marca,
                     modelo=auto.modelo,
                     placa=auto.placa
-                )
-                print(f"Correo enviado al reportante: {reportante.correo}")
-            except Exception as e:
-                print(f"Error enviando correo al reportante: {e}")
+                ))
+            await db.commit()
+            if cambio:
+                cache_consultas.invalidar_persona(persona_afectada.id)
+                despachador_correos.avisar()
             
-            mensaje = f"Incidencia aprobada. Total de incidencias: {persona_afectada.noIncidencias}"
+            if cambio:
+                mensaje = f"Incidencia aprobada. Total de incidencias: {persona_afectada.noIncidencias}"
+            else:
+                mensaje = f"La incidencia ya estaba aprobada. Total de incidencias: {persona_afectada.noIncidencias}"
             if persona_afectada.estatus == "Bloqueado":
                 mensaje += ". ⚠️ Usuario BLOQUEADO."
             
-            return {
-                "message": mensaje,
-                "incidencia_id": incidencia.id,
-                "estatus": incidencia.estatus,
-                "persona_afectada": {
-                    "id": persona_afectada.id,
-                    "nombre": persona_afectada.nombre,
-                    "noIncidencias": persona_afectada.noIncidencias,
-                    "estatus": persona_afectada.estatus
-                },
-                "reportante": {
-                    "id": reportante.id,
-                    "nombre": reportante.nombre,
-                    "correo": reportante.correo
-                }
-            }
+            return EstatusIncidenciaResultado(
+                message=mensaje,
+                incidencia_id=incidencia.id,
+                estatus=incidencia.estatus,
+                persona_afectada=PersonaEstatus.model_validate(persona_afectada),
+                reportante=ReportanteResumen.model_validate(reportante),
+            )
         
         elif estatus == "Rechazada":
-            db.commit()
-            
-            try:
-                enviar_correo_incidencia_rechazada(
-                    email_reportante=reportante.correo,
+            if cambio:
+                encolar_correo(db, reportante.correo, *correo_incidencia_rechazada(
                     incidencia_id=incidencia.id,
                     fecha=incidencia.fecha,
                     hora=incidencia.hora,
                     descripcion=incidencia.descripcion
-                )
-                print(f"Correo de rechazo enviado al reportante: {reportante.correo}")
-            except Exception as e:
-                print(f"Error enviando correo de rechazo: {e}")
+                ))
+            await db.commit()
+            if cambio:
+                despachador_correos.avisar()
             
-            return {
-                "message": "Incidencia rechazada. Correo enviado al reportante.",
-                "incidencia_id": incidencia.id,
-                "estatus": incidencia.estatus,
-                "reportante": {
-                    "id": reportante.id,
-                    "nombre": reportante.nombre,
-                    "correo": reportante.correo
-                }
-            }
+            return EstatusIncidenciaResultado(
+                message="Incidencia rechazada. Correo enviado al reportante."
+                if cambio else "La incidencia ya estaba rechazada.",
+                incidencia_id=incidencia.id,
+                estatus=incidencia.estatus,
+                reportante=ReportanteResumen.model_validate(reportante),
+            )
         
         else:
-            db.commit()
-            return {
-                "message": f"Estatus actualizado a: {estatus}",
-                "incidencia_id": incidencia.id,
-                "estatus": incidencia.estatus
-            }
+            await db.commit()
+            return EstatusIncidenciaResultado(
+                message=f"Estatus actualizado a: {estatus}",
+                incidencia_id=incidencia.id,
+                estatus=incidencia.estatus,
+            )
             
     except HTTPException:
         raise
+    except DBAPIError as e:
+        await db.rollback()
+        if es_conflicto_concurrencia(e):
+            raise HTTPException(status_code=409, detail="La incidencia se está revisando en otra petición; intente de nuevo")
+        raise HTTPException(status_code=500, detail=f"Error actualizando incidencia: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error actualizando incidencia: {str(e)}")
-    finally:
-        db.close()
\ No newline at end of file
+
+
+@app.patch("/incidencias/estatus", response_model=RevisionResultado)
+async def revisar_incidencias(revision: RevisionIncidencias, db: AsyncSession = Depends(get_db)):
+    """Aplica varias decisiones (id, estatus) en una sola transacción.
+
+    Un solo UPDATE condicional para todas las incidencias y uno solo para los
+    contadores de todas las personas; las incidencias que ya tenían el estatus
+    pedido no se vuelven a contar. Cada destinatario recibe un solo correo con
+    todo lo que le tocó. Si la BD aborta la transacción por un deadlock o una
+    falla de serialización responde 409 y no se aplica nada.
+    """
+    decisiones = {d.id: d.estatus for d in revision.decisiones}
+    if len(decisiones) != len(revision.decisiones):
+        raise HTTPException(status_code=422, detail="Hay incidencias repetidas en la revisión")
+
+    try:
+        cambios = {fila.id: fila for fila in await transicionar_incidencias(db, decisiones)}
+
+        conteos: dict[int, int] = defaultdict(int)
+        for fila in cambios.values():
+            if decisiones[fila.id] == "Aprobada":
+                conteos[fila.persona_id] += 1
+        contadores = await sumar_incidencias(db, conteos) if conteos else {}
+    except DBAPIError as e:
+        await db.rollback()
+        if es_conflicto_concurrencia(e):
+            raise HTTPException(status_code=409, detail="Otra revisión tocó las mismas incidencias; intente de nuevo")
+        raise
+
+    incidencias = (await db.scalars(
+        consulta_incidencias().where(Incidencia.id.in_(decisiones)).execution_options(populate_existing=True)
+    )).all()
+    faltantes = sorted(set(decisiones) - {inc.id for inc in incidencias})
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Incidencias no encontradas: {faltantes}")
+    for inc in incidencias:
+        if not inc.persona_afectada or not inc.auto or not inc.reportante:
+            raise HTTPException(status_code=404, detail=f"Datos relacionados no encontrados (incidencia {inc.id})")
+
+    # Por persona: incidencias aprobadas en su contra y reportes suyos aprobados/rechazados.
+    afectadas: dict[int, list[Incidencia]] = defaultdict(list)
+    aprobados: dict[int, list[Incidencia]] = defaultdict(list)
+    rechazados: dict[int, list[Incidencia]] = defaultdict(list)
+    personas: dict[int, Persona] = {}
+
+    for inc in sorted(incidencias, key=lambda i: i.id):
+        if inc.id not in cambios:
+            continue
+        if inc.estatus == "Aprobada":
+            afectadas[inc.persona_id].append(inc)
+            aprobados[inc.reportante_id].append(inc)
+        elif inc.estatus == "Rechazada":
+            rechazados[inc.reportante_id].append(inc)
+        personas[inc.persona_id] = inc.persona_afectada
+        personas[inc.reportante_id] = inc.reportante
+
+    correos = 0
+    for persona_id in afectadas.keys() | aprobados.keys() | rechazados.keys():
+        persona = personas[persona_id]
+        encolar_correo(db, persona.correo, *correo_revision(
+            persona.nombre, persona.noIncidencias or 0,
+            afectadas.get(persona_id, []), aprobados.get(persona_id, []), rechazados.get(persona_id, []),
+        ))
+        correos += 1
+
+    await db.commit()
+    for persona_id in contadores:
+        cache_consultas.invalidar_persona(persona_id)
+    if correos:
+        despachador_correos.avisar()
+
+    return RevisionResultado(
+        actualizadas=len(cambios),
+        aprobadas=sum(conteos.values()),
+        rechazadas=sum(len(lista) for lista in rechazados.values()),
+        personas=[
+            PersonaEstatus(id=i, nombre=personas[i].nombre, noIncidencias=numero, estatus=estatus_persona)
+            for i, (numero, estatus_persona) in sorted(contadores.items())
+        ],
+        correos=correos,
+    )
+
+
+# ========== Exportaciones ==========
+
+def respuesta_export(consulta, formato: str, nombre: str):
+    """Streaming de una consulta en NDJSON o CSV, leída por bloques con un cursor del lado del servidor.
+
+    La sesión se abre dentro del generador: vive lo que dure la descarga y
+    solo hay un bloque de filas en memoria a la vez.
+    """
+    async def generar():
+        async with AsyncSessionLocal() as db:
+            resultado = await db.stream(consulta.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            columnas = list(resultado.keys())
+            if formato == "csv":
+                buf = io.StringIO()
+                escritor = csv.writer(buf)
+                escritor.writerow(columnas)
+                yield buf.getvalue()
+
+            async for filas in resultado.partitions():
+                if formato == "csv":
+                    buf = io.StringIO()
+                    csv.writer(buf).writerows(filas)
+                    yield buf.getvalue()
+                else:
+                    yield "".join(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + "\n" for fila in filas)
+
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generar(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
+
+
+@app.get("/export/incidencias")
+async def exportar_incidencias(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    estatus: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+):
+    afectada = aliased(Persona)
+    reportante = aliased(Persona)
+    consulta = (
+        select(
+            Incidencia.id,
+            Incidencia.fecha,
+            Incidencia.hora,
+            Incidencia.estatus,
+            Incidencia.descripcion,
+            Incidencia.latitud,
+            Incidencia.longitud,
+            afectada.id.label("persona_afectada_id"),
+            afectada.nombre.label("persona_afectada_nombre"),
+            afectada.numeroControl.label("persona_afectada_numeroControl"),
+            reportante.id.label("reportante_id"),
+            reportante.nombre.label("reportante_nombre"),
+            Auto.id.label("auto_id"),
+            Auto.placa,
+        )
+        .join(afectada, Incidencia.persona_id == afectada.id)
+        .join(reportante, Incidencia.reportante_id == reportante.id)
+        .join(Auto, Incidencia.auto_id == Auto.id)
+        .order_by(Incidencia.id)
+    )
+    return respuesta_export(filtrar_incidencias(consulta, estatus, desde, hasta), formato, "incidencias")
+
+
+@app.get("/export/autos")
+async def exportar_autos(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    estatus: str | None = None,
+):
+    """Autos con su dueño; `estatus` filtra por el estatus del dueño (Autorizado, Bloqueado)"""
+    consulta = (
+        select(
+            Auto.id,
+            Auto.placa,
+            Auto.marca,
+            Auto.modelo,
+            Auto.color,
+            Persona.id.label("persona_id"),
+            Persona.nombre.label("persona_nombre"),
+            Persona.numeroControl.label("persona_numeroControl"),
+            Persona.estatus.label("persona_estatus"),
+        )
+        .join(Persona, Auto.persona_id == Persona.id)
+        .order_by(Auto.id)
+    )
+    if estatus is not None:
+        consulta = consulta.where(Persona.estatus == estatus)
+    return respuesta_export(consulta, formato, "autos")
@@ -0,0 +1,71 @@
+import time
+from contextvars import ContextVar
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import event
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PETICION_SEGUNDOS = Histogram(
+    "http_peticion_segundos", "Duración de las peticiones HTTP", ["metodo", "ruta", "estatus"], buckets=_BUCKETS
+)
+OCR_ETAPA_SEGUNDOS = Histogram(
+    "ocr_etapa_segundos", "Duración de cada etapa del pipeline de OCR", ["etapa"], buckets=_BUCKETS
+)
+OCR_EN_VUELO = Gauge("ocr_en_vuelo", "Imágenes de OCR en proceso")
+BD_CONSULTA_SEGUNDOS = Histogram("bd_consulta_segundos", "Duración de cada sentencia SQL", buckets=_BUCKETS)
+BD_TRANSACCION_SEGUNDOS = Histogram(
+    "bd_transaccion_segundos", "Duración de las transacciones de sesión", buckets=_BUCKETS
+)
+SENDGRID_SEGUNDOS = Histogram(
+    "sendgrid_envio_segundos", "Latencia de las llamadas a SendGrid", ["resultado"], buckets=_BUCKETS
+)
+
+# Tiempos (ms) de la petición actual para el encabezado Server-Timing.
+tiempos_peticion: ContextVar[dict[str, float] | None] = ContextVar("tiempos_peticion", default=None)
+
+
+def acumular_tiempo(nombre: str, ms: float):
+    tiempos = tiempos_peticion.get()
+    if tiempos is not None:
+        tiempos[nombre] = tiempos.get(nombre, 0.0) + ms
+
+
+def registrar_etapas_ocr(tiempos: dict[str, float]):
+    """Observa en el histograma y suma al Server-Timing cada etapa (en ms) del OCR"""
+    for etapa, ms in tiempos.items():
+        OCR_ETAPA_SEGUNDOS.labels(etapa).observe(ms / 1000)
+        acumular_tiempo(etapa, ms)
+
+
+def encabezado_server_timing(tiempos: dict[str, float]) -> str:
+    return ", ".join(f"{nombre};dur={ms:.2f}" for nombre, ms in tiempos.items())
+
+
+def instrumentar_bd(engine, sessionmaker_):
+    """Mide cada sentencia SQL del engine y cada transacción de las sesiones"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicios_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("inicios_consulta")
+        if not inicios:
+            return
+        segundos = time.perf_counter() - inicios.pop()
+        BD_CONSULTA_SEGUNDOS.observe(segundos)
+        acumular_tiempo("sql", segundos * 1000)
+
+    @event.listens_for(sessionmaker_, "after_begin")
+    def _inicio_transaccion(session, transaction, connection):
+        session.info["inicio_transaccion"] = time.perf_counter()
+
+    @event.listens_for(sessionmaker_, "after_transaction_end")
+    def _fin_transaccion(session, transaction):
+        if transaction.parent is not None:
+            return
+        inicio = session.info.pop("inicio_transaccion", None)
+        if inicio is not None:
+            BD_TRANSACCION_SEGUNDOS.observe(time.perf_counter() - inicio)
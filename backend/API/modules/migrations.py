@@ -0,0 +1,166 @@
+import json
+
+from sqlalchemy import DateTime, bindparam, inspect, text
+
+from .imageStore import AlmacenImagenes, decodificar_payload, es_referencia
+from .models import combinar_fecha_hora
+from .plateIndex import canonizar_placa
+
+
+def _columnas(conn, tabla: str) -> set[str]:
+    return {c["name"] for c in inspect(conn).get_columns(tabla)}
+
+
+def _m001_placa_clave(conn):
+    """Agrega autos.placa_clave, la llena a partir de autos.placa y le pone índice único"""
+    if "placa_clave" not in _columnas(conn, "autos"):
+        conn.execute(text("ALTER TABLE autos ADD COLUMN placa_clave VARCHAR"))
+
+    pendientes = conn.execute(text("SELECT id, placa FROM autos WHERE placa_clave IS NULL")).all()
+    if pendientes:
+        conn.execute(
+            text("UPDATE autos SET placa_clave = :clave WHERE id = :id"),
+            [{"id": auto_id, "clave": canonizar_placa(placa)} for auto_id, placa in pendientes],
+        )
+
+    # Placas distintas que quedan iguales al canonizarlas (ABC-123 y ABC123) tumbarían el índice
+    # con un IntegrityError; se reportan para corregirlas a mano antes de reintentar.
+    repetidas = conn.execute(text(
+        "SELECT a.placa_clave, a.id, a.placa FROM autos a WHERE a.placa_clave IN "
+        "(SELECT placa_clave FROM autos GROUP BY placa_clave HAVING COUNT(*) > 1) ORDER BY a.placa_clave, a.id"
+    )).all()
+    if repetidas:
+        grupos: dict[str, list[str]] = {}
+        for clave, auto_id, placa in repetidas:
+            grupos.setdefault(clave, []).append(f"{placa} (auto {auto_id})")
+        detalle = "\n".join(f"  {clave}: {', '.join(autos)}" for clave, autos in grupos.items())
+        raise RuntimeError(
+            f"No se puede crear el índice único de placas: {len(grupos)} placas se repiten al canonizarlas. "
+            f"Corrija o elimine los autos duplicados y reinicie:\n{detalle}"
+        )
+
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_autos_placa_clave ON autos (placa_clave)"))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE autos ALTER COLUMN placa_clave SET NOT NULL"))
+
+
+def _m002_imagenes_al_almacen(conn):
+    """Mueve las imágenes guardadas inline (base64) en incidencias.imagenes al almacén por contenido.
+
+    Las demás entradas (rutas locales del teléfono que guardaban las versiones
+    anteriores de la app, o base64 que no es una imagen) se dejan como están: la
+    app todavía muestra esas rutas y borrarlas no tendría vuelta atrás.
+    """
+    almacen = AlmacenImagenes()
+    cambios = []
+    filas = conn.execution_options(stream_results=True).execute(
+        text("SELECT id, imagenes FROM incidencias WHERE imagenes IS NOT NULL AND imagenes <> '[]'")
+    )
+    for incidencia_id, imagenes in filas:
+        try:
+            entradas = json.loads(imagenes)
+        except ValueError:
+            entradas = [imagenes]
+        if not isinstance(entradas, list):
+            entradas = [entradas]
+
+        nuevas = []
+        for entrada in entradas:
+            entrada = str(entrada)
+            datos = None if es_referencia(entrada) else decodificar_payload(entrada)
+            if datos is not None:
+                try:
+                    entrada = almacen.guardar(datos)
+                except ValueError:
+                    pass
+            nuevas.append(entrada)
+        if nuevas != entradas:
+            cambios.append({"id": incidencia_id, "imagenes": json.dumps(nuevas)})
+
+    if cambios:
+        conn.execute(text("UPDATE incidencias SET imagenes = :imagenes WHERE id = :id"), cambios)
+
+
+def _m003_fecha_hora_e_indices(conn):
+    """Agrega incidencias.fecha_hora (llenada desde fecha/hora) e índices en las FK y en (estatus, fecha_hora).
+
+    Las filas con una fecha que no se puede interpretar se quedan con NULL y se
+    reportan; siguen apareciendo en los listados, solo no en los filtros por fecha.
+    """
+    if "fecha_hora" not in _columnas(conn, "incidencias"):
+        conn.execute(text("ALTER TABLE incidencias ADD COLUMN fecha_hora TIMESTAMP"))
+
+    cambios = []
+    sin_fecha = 0
+    filas = conn.execution_options(stream_results=True).execute(
+        text("SELECT id, fecha, hora FROM incidencias WHERE fecha_hora IS NULL")
+    )
+    for incidencia_id, fecha, hora in filas:
+        fecha_hora = combinar_fecha_hora(fecha, hora)
+        if fecha_hora is None:
+            sin_fecha += 1
+        else:
+            cambios.append({"id": incidencia_id, "fecha_hora": fecha_hora})
+
+    if cambios:
+        # Con el tipo DateTime cada dialecto guarda el valor igual que el ORM.
+        actualizar = text("UPDATE incidencias SET fecha_hora = :fecha_hora WHERE id = :id").bindparams(
+            bindparam("fecha_hora", type_=DateTime)
+        )
+        conn.execute(actualizar, cambios)
+    if sin_fecha:
+        print(f"Migración 3: {sin_fecha} incidencias con fecha no reconocida quedaron sin fecha_hora")
+
+    # Mismos nombres que genera create_all para los índices del modelo.
+    for nombre, columnas in (
+        ("ix_incidencias_persona_id", "persona_id"),
+        ("ix_incidencias_reportante_id", "reportante_id"),
+        ("ix_incidencias_auto_id", "auto_id"),
+        ("ix_incidencias_estatus_fecha_hora", "estatus, fecha_hora"),
+    ):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON incidencias ({columnas})"))
+
+
+# (versión, descripción, función). Solo se agregan al final; nunca se editan las ya publicadas.
+MIGRACIONES = [
+    (1, "placa_clave en autos", _m001_placa_clave),
+    (2, "imágenes de incidencias al almacén por contenido", _m002_imagenes_al_almacen),
+    (3, "fecha_hora e índices en incidencias", _m003_fecha_hora_e_indices),
+]
+
+
+# Llave del advisory lock de Postgres para que dos procesos no migren a la vez.
+_LLAVE_BLOQUEO = 7201
+
+
+def aplicar_migraciones(engine):
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción.
+
+    `Base.metadata.create_all` solo crea tablas nuevas; los cambios a tablas ya
+    existentes se hacen aquí. Las migraciones son idempotentes para que también
+    funcionen sobre una base recién creada por `create_all`.
+    """
+    with engine.connect() as conn:
+        es_postgres = conn.dialect.name == "postgresql"
+        if es_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:llave)"), {"llave": _LLAVE_BLOQUEO})
+        try:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+            actual = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+            conn.commit()
+
+            for version, descripcion, migrar in MIGRACIONES:
+                if version <= actual:
+                    continue
+                try:
+                    migrar(conn)
+                    conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                print(f"Migración {version} aplicada: {descripcion}")
+        finally:
+            if es_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:llave)"), {"llave": _LLAVE_BLOQUEO})
+                conn.commit()
@@ -1,9 +1,44 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, validates
 from .config import Base
+from .plateIndex import canonizar_placa
+
+_FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+_FORMATOS_HORA = ("%H:%M:%S", "%H:%M", "%H:%M:%S.%f", "%I:%M %p", "%I:%M:%S %p")
+
+
+def combinar_fecha_hora(fecha: str | None, hora: str | None) -> datetime | None:
+    """`fecha` y `hora` (texto libre de la app) a un datetime local sin zona; None si la fecha no se entiende"""
+    fecha = (fecha or "").strip()
+    try:
+        valor = datetime.fromisoformat(fecha)
+    except ValueError:
+        valor = None
+        for formato in _FORMATOS_FECHA:
+            try:
+                valor = datetime.strptime(fecha, formato)
+                break
+            except ValueError:
+                continue
+    if valor is None:
+        return None
+
+    hora = (hora or "").strip()
+    # Si la fecha ya traía hora ("2025-01-02T10:30:00") esa manda.
+    if hora and valor.time() == datetime.min.time():
+        for formato in _FORMATOS_HORA:
+            try:
+                return datetime.combine(valor.date(), datetime.strptime(hora.upper(), formato).time())
+            except ValueError:
+                continue
+    return valor
+
 
 class Incidencia(Base):
     __tablename__ = 'incidencias'
+    __table_args__ = (Index('ix_incidencias_estatus_fecha_hora', 'estatus', 'fecha_hora'),)
 
     id = Column(Integer, primary_key=True, index=True)
     descripcion = Column(String, nullable=False)
@@ -13,9 +48,11 @@ class Incidencia(Base):
     estatus = Column(String, default="Pendiente") 
     latitud = Column(String, nullable=True)
     longitud = Column(String, nullable=True)
-    persona_id = Column(Integer, ForeignKey('personas.id', ondelete = "CASCADE"), nullable=False)
-    reportante_id = Column(Integer, ForeignKey('personas.id', ondelete = "CASCADE"), nullable=False)
-    auto_id = Column(Integer, ForeignKey('autos.id', ondelete = "CASCADE"), nullable=False)
+    # `fecha` + `hora` como timestamp (hora local); es la columna contra la que se filtra por fechas.
+    fecha_hora = Column(DateTime, nullable=True)
+    persona_id = Column(Integer, ForeignKey('personas.id', ondelete = "CASCADE"), nullable=False, index=True)
+    reportante_id = Column(Integer, ForeignKey('personas.id', ondelete = "CASCADE"), nullable=False, index=True)
+    auto_id = Column(Integer, ForeignKey('autos.id', ondelete = "CASCADE"), nullable=False, index=True)
 
     persona_afectada = relationship(
         "Persona",
@@ -30,6 +67,14 @@ class Incidencia(Base):
     )
     
     auto = relationship("Auto", back_populates="incidencias")
+
+    @validates("fecha", "hora")
+    def _asignar_fecha_hora(self, key, valor):
+        fecha = valor if key == "fecha" else self.fecha
+        hora = valor if key == "hora" else self.hora
+        self.fecha_hora = combinar_fecha_hora(fecha, hora)
+        return valor
+
 class Persona(Base):
     __tablename__ = 'personas'
 
@@ -65,11 +110,18 @@ class Auto(Base):
     modelo = Column(String, nullable=False)
     color = Column(String, nullable=False)
     placa = Column(String, nullable=False, unique=True, index=True)
+    # Placa sin separadores y en mayúsculas; es la columna contra la que se busca.
+    placa_clave = Column(String, nullable=False, unique=True, index=True)
     persona_id = Column(Integer, ForeignKey('personas.id', ondelete = "CASCADE"), nullable=False)
 
     persona = relationship("Persona", back_populates="autos")
     incidencias = relationship("Incidencia", back_populates="auto")
 
+    @validates("placa")
+    def _asignar_placa_clave(self, key, placa):
+        self.placa_clave = canonizar_placa(placa)
+        return placa
+
 class Perfil(Base):
     __tablename__ = 'perfiles'
 
@@ -77,4 +129,23 @@ class Perfil(Base):
     nombre = Column(String, nullable=False)
     descripcion = Column(String, nullable=True)
 
-    personas = relationship("Persona", back_populates="perfil")
\ No newline at end of file
+    personas = relationship("Persona", back_populates="perfil")
+
+
+class CorreoPendiente(Base):
+    """Bandeja de salida: la transacción que origina el correo lo inserta y el worker lo envía"""
+    __tablename__ = 'correos_pendientes'
+    __table_args__ = (Index('ix_correos_pendientes_estado_siguiente', 'estado', 'siguiente_intento'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    destinatario = Column(String, nullable=False)
+    asunto = Column(String, nullable=False)
+    cuerpo = Column(String, nullable=False)
+    # pendiente -> enviado | fallido
+    estado = Column(String, nullable=False, default="pendiente")
+    intentos = Column(Integer, nullable=False, default=0)
+    # Fechas en UTC.
+    creado = Column(DateTime, nullable=False)
+    siguiente_intento = Column(DateTime, nullable=False)
+    enviado = Column(DateTime, nullable=True)
+    ultimo_error = Column(String, nullable=True)
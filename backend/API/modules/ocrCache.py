@@ -0,0 +1,155 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from .config import OCR_CACHE_MAX_DISTANCE, OCR_CACHE_SIZE, OCR_CACHE_TTL_S
+
+
+# El dHash de 64 bits se parte en 4 bloques de 16: dos hashes a distancia < 4
+# comparten por lo menos un bloque idéntico, así se buscan por bloque y no uno por uno.
+_BLOQUES = 4
+_BITS_BLOQUE = 64 // _BLOQUES
+
+
+def hash_contenido(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def dhash(img: np.ndarray) -> int:
+    """Hash perceptual por diferencias (64 bits) de una imagen BGR o en grises"""
+    gris = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    chica = cv2.resize(gris, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (chica[:, 1:] > chica[:, :-1]).flatten()
+    valor = 0
+    for bit in bits:
+        valor = (valor << 1) | int(bit)
+    return valor
+
+
+def _bloques(h: int) -> list[int]:
+    mascara = (1 << _BITS_BLOQUE) - 1
+    return [(h >> (i * _BITS_BLOQUE)) & mascara for i in range(_BLOQUES)]
+
+
+@dataclass
+class _Entrada:
+    dhash: int | None
+    candidatos: list[tuple[str, float]]
+    expira: float
+
+
+class CacheOCR:
+    """Cache LRU con TTL de resultados de OCR en dos niveles.
+
+    Primero se busca el SHA-256 exacto de los bytes subidos (reintentos del
+    cliente); si falla, se busca un dHash a distancia de Hamming <= `max_distancia`
+    (cuadros casi idénticos del mismo auto detenido). Con `max_distancia` < 0
+    (por defecto) solo queda el nivel exacto: el dHash del cuadro completo no
+    distingue dos placas distintas frente al mismo fondo.
+    """
+
+    def __init__(self, capacidad: int = OCR_CACHE_SIZE, ttl_s: float = OCR_CACHE_TTL_S,
+                 max_distancia: int = OCR_CACHE_MAX_DISTANCE):
+        self.capacidad = capacidad
+        self.ttl = ttl_s
+        self.max_distancia = max_distancia
+        self._entradas: OrderedDict[str, _Entrada] = OrderedDict()
+        self._indice: list[dict[int, set[str]]] = [{} for _ in range(_BLOQUES)]
+        self.aciertos_exactos = 0
+        self.aciertos_similares = 0
+        self.fallos = 0
+
+    @property
+    def activo(self) -> bool:
+        return self.capacidad > 0
+
+    @property
+    def similar_activo(self) -> bool:
+        return self.activo and self.max_distancia >= 0
+
+    def _quitar(self, clave: str):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None or entrada.dhash is None:
+            return
+        for i, bloque in enumerate(_bloques(entrada.dhash)):
+            claves = self._indice[i].get(bloque)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._indice[i][bloque]
+
+    def _vigente(self, clave: str) -> _Entrada | None:
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        if entrada.expira < time.monotonic():
+            self._quitar(clave)
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada
+
+    def buscar_exacto(self, sha: str) -> list[tuple[str, float]] | None:
+        if not self.activo:
+            return None
+        entrada = self._vigente(sha)
+        if entrada is None:
+            return None
+        self.aciertos_exactos += 1
+        return entrada.candidatos
+
+    def buscar_similar(self, h: int) -> list[tuple[str, float]] | None:
+        if not self.similar_activo:
+            return None
+
+        if self.max_distancia < _BLOQUES:
+            posibles = set()
+            for i, bloque in enumerate(_bloques(h)):
+                posibles |= self._indice[i].get(bloque, set())
+        else:
+            posibles = set(self._entradas)
+
+        mejor, mejor_distancia = None, self.max_distancia + 1
+        for clave in posibles:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada.dhash is None:
+                continue
+            distancia = (entrada.dhash ^ h).bit_count()
+            if distancia < mejor_distancia:
+                mejor, mejor_distancia = clave, distancia
+
+        entrada = self._vigente(mejor) if mejor is not None else None
+        if entrada is None:
+            return None
+        self.aciertos_similares += 1
+        return entrada.candidatos
+
+    def registrar_fallo(self):
+        if self.activo:
+            self.fallos += 1
+
+    def guardar(self, sha: str, h: int | None, candidatos: list[tuple[str, float]]):
+        if not self.activo:
+            return
+        self._quitar(sha)
+        self._entradas[sha] = _Entrada(h, candidatos, time.monotonic() + self.ttl)
+        if h is not None:
+            for i, bloque in enumerate(_bloques(h)):
+                self._indice[i].setdefault(bloque, set()).add(sha)
+
+        while len(self._entradas) > self.capacidad:
+            self._quitar(next(iter(self._entradas)))
+
+    def estadisticas(self) -> dict:
+        return {
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad,
+            "ttl_s": self.ttl,
+            "max_distancia": self.max_distancia,
+            "aciertos_exactos": self.aciertos_exactos,
+            "aciertos_similares": self.aciertos_similares,
+            "fallos": self.fallos,
+        }
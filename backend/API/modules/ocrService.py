@@ -0,0 +1,260 @@
+import asyncio
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from paddleocr import PaddleOCR, TextRecognition
+
+from .config import OCR_BATCH_SIZE, OCR_BATCH_WAIT_MS, OCR_CPU_THREADS, OCR_POOL_SIZE
+
+
+@dataclass(frozen=True)
+class PerfilOCR:
+    nombre: str
+    descripcion: str
+    # Sin modelo de detección el perfil solo reconoce: espera un recorte ajustado de la placa.
+    modelo_det: str | None = None
+    modelo_rec: str | None = None
+    solo_reconocimiento: bool = False
+
+
+PERFILES_OCR = {
+    p.nombre: p
+    for p in [
+        PerfilOCR("estandar", "Modelos por defecto de PaddleOCR para lang=en"),
+        PerfilOCR("mobile", "Detección y reconocimiento ligeros",
+                  modelo_det="PP-OCRv5_mobile_det", modelo_rec="en_PP-OCRv5_mobile_rec"),
+        PerfilOCR("server", "Detección y reconocimiento de servidor",
+                  modelo_det="PP-OCRv5_server_det", modelo_rec="PP-OCRv5_server_rec"),
+        PerfilOCR("rec-only", "Solo reconocimiento ligero, sin detección de texto",
+                  modelo_rec="en_PP-OCRv5_mobile_rec", solo_reconocimiento=True),
+        PerfilOCR("rec-only-server", "Solo reconocimiento de servidor, sin detección de texto",
+                  modelo_rec="PP-OCRv5_server_rec", solo_reconocimiento=True),
+    ]
+}
+
+
+def crear_motor_ocr(perfil: PerfilOCR, cpu_threads: int = OCR_CPU_THREADS):
+    if perfil.solo_reconocimiento:
+        return TextRecognition(model_name=perfil.modelo_rec, cpu_threads=cpu_threads)
+
+    modelos = {}
+    if perfil.modelo_det:
+        modelos["text_detection_model_name"] = perfil.modelo_det
+    if perfil.modelo_rec:
+        modelos["text_recognition_model_name"] = perfil.modelo_rec
+
+    return PaddleOCR(
+        lang=None if modelos else "en",
+        use_doc_orientation_classify=False,
+        use_doc_unwarping=False,
+        use_textline_orientation=False,
+        cpu_threads=cpu_threads,
+        **modelos,
+    )
+
+
+def extraer_candidatos(res) -> list[tuple[str, float]]:
+    """Convierte un resultado de PaddleOCR (o de TextRecognition) en una lista de (texto, score)"""
+    data = res.json
+    res_data = data.get("res", {})
+    if "rec_text" in res_data:
+        rec_texts = [res_data.get("rec_text")]
+        rec_scores = [res_data.get("rec_score")]
+    else:
+        rec_texts = res_data.get("rec_texts", []) or []
+        rec_scores = res_data.get("rec_scores", []) or []
+
+    candidatos: list[tuple[str, float]] = []
+    for t, s in zip(rec_texts, rec_scores):
+        if t and s is not None:
+            candidatos.append((str(t), float(s)))
+    return candidatos
+
+
+def normalizar_placa(texto: str) -> str:
+    texto = texto.upper().strip()
+    texto = texto.replace(" ", "")
+    return texto
+
+
+def parece_placa(norm: str) -> bool:
+    if len(norm) < 5 or len(norm) > 10:
+        return False
+
+    tiene_num = any(c.isdigit() for c in norm)
+    tiene_letra = any(c.isalpha() for c in norm)
+    return tiene_num and tiene_letra
+
+
+def elegir_placa(candidatos: list[tuple[str, float]]) -> tuple[str, str, float]:
+    """Elige el candidato con mejor score que tenga forma de placa (texto crudo, normalizado, score)"""
+    if not candidatos:
+        raise ValueError("No se pudo extraer texto de la placa")
+
+    placa_candidatos: list[tuple[str, str, float]] = []
+
+    for text, score in candidatos:
+        norm = normalizar_placa(text)
+        if parece_placa(norm):
+            placa_candidatos.append((text, norm, score))
+
+    if placa_candidatos:
+        placa_candidatos.sort(key=lambda x: x[2], reverse=True)
+        return placa_candidatos[0]
+
+    texto_crudo, mejor_score = max(candidatos, key=lambda x: x[1])
+    return texto_crudo, normalizar_placa(texto_crudo), mejor_score
+
+
+def imagen_sintetica_placa(texto: str = "ABC-123-A") -> np.ndarray:
+    """Placa blanca con texto negro, suficiente para calentar el detector y el reconocedor"""
+    img = np.full((120, 400, 3), 255, dtype=np.uint8)
+    cv2.rectangle(img, (4, 4), (395, 115), (0, 0, 0), 3)
+    cv2.putText(img, texto, (24, 82), cv2.FONT_HERSHEY_SIMPLEX, 1.8, (0, 0, 0), 5, cv2.LINE_AA)
+    return img
+
+
+class PoolOCR:
+    """Mantiene `tamano` instancias de PaddleOCR de un perfil y ejecuta la inferencia en hilos.
+
+    Cada hilo del executor toma una instancia libre, así nunca hay dos
+    predicciones sobre la misma instancia y el event loop queda libre.
+    """
+
+    def __init__(self, perfil: PerfilOCR, tamano: int = OCR_POOL_SIZE, cpu_threads: int = OCR_CPU_THREADS):
+        self.perfil = perfil
+        self.tamano = max(1, tamano)
+        self._motores: queue.Queue = queue.Queue()
+        for _ in range(self.tamano):
+            self._motores.put(crear_motor_ocr(perfil, cpu_threads))
+        self._executor = ThreadPoolExecutor(max_workers=self.tamano, thread_name_prefix=f"ocr-{perfil.nombre}")
+
+    def _predict(self, imgs):
+        motor = self._motores.get()
+        try:
+            return motor.predict(imgs)
+        finally:
+            self._motores.put(motor)
+
+    async def predict(self, imgs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._predict, imgs)
+
+    def calentar(self, img: np.ndarray):
+        """Corre una inferencia en cada instancia para pagar la inicialización perezosa antes del tráfico real"""
+        motores = [self._motores.get() for _ in range(self.tamano)]
+        try:
+            for motor in motores:
+                motor.predict([img])
+        finally:
+            for motor in motores:
+                self._motores.put(motor)
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoteadorOCR:
+    """Agrupa peticiones concurrentes de OCR en lotes.
+
+    Cada petición entra a una cola; el ciclo de fondo junta hasta `tam_lote`
+    imágenes o espera como máximo `espera_ms` desde la primera, ejecuta un solo
+    `predict` con todo el lote y reparte cada resultado a quien lo pidió.
+    Hay a lo más un lote en vuelo por instancia del pool; mientras el pool está
+    ocupado las peticiones siguen acumulándose en la cola.
+    """
+
+    def __init__(self, pool: PoolOCR, tam_lote: int = OCR_BATCH_SIZE, espera_ms: float = OCR_BATCH_WAIT_MS):
+        self.pool = pool
+        self.tam_lote = max(1, tam_lote)
+        self.espera = max(0.0, espera_ms) / 1000
+        self._cola: asyncio.Queue | None = None
+        self._tarea: asyncio.Task | None = None
+        self._en_vuelo: asyncio.Semaphore | None = None
+        # Referencias a los lotes en vuelo: el loop solo guarda referencias débiles a sus tareas.
+        self._lotes: set[asyncio.Task] = set()
+
+    def iniciar(self):
+        self._cola = asyncio.Queue()
+        self._en_vuelo = asyncio.Semaphore(self.pool.tamano)
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        """Detiene el ciclo y los lotes en vuelo; las peticiones pendientes terminan con error"""
+        if self._tarea is None:
+            return
+        self._tarea.cancel()
+        for tarea in self._lotes:
+            tarea.cancel()
+        await asyncio.gather(self._tarea, *self._lotes, return_exceptions=True)
+        self._tarea = None
+
+        error = RuntimeError("Loteador OCR detenido")
+        while not self._cola.empty():
+            _, fut = self._cola.get_nowait()
+            if not fut.done():
+                fut.set_exception(error)
+
+    async def reconocer(self, img: np.ndarray) -> list[tuple[str, float]]:
+        if self._cola is None:
+            raise RuntimeError("Loteador OCR no iniciado")
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((img, futuro))
+        return await futuro
+
+    async def _juntar_lote(self) -> list[tuple[np.ndarray, asyncio.Future]]:
+        lote = [await self._cola.get()]
+        limite = asyncio.get_running_loop().time() + self.espera
+
+        while len(lote) < self.tam_lote:
+            restante = limite - asyncio.get_running_loop().time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+            except asyncio.CancelledError:
+                for _, fut in lote:
+                    if not fut.done():
+                        fut.set_exception(RuntimeError("Loteador OCR detenido"))
+                raise
+        return lote
+
+    async def _ciclo(self):
+        while True:
+            await self._en_vuelo.acquire()
+            lote = await self._juntar_lote()
+            # Se descartan las peticiones cuyo cliente ya se fue.
+            lote = [(img, fut) for img, fut in lote if not fut.done()]
+            if not lote:
+                self._en_vuelo.release()
+                continue
+            tarea = asyncio.create_task(self._procesar(lote))
+            self._lotes.add(tarea)
+            tarea.add_done_callback(self._lotes.discard)
+
+    async def _procesar(self, lote: list[tuple[np.ndarray, asyncio.Future]]):
+        try:
+            resultados = await self.pool.predict([img for img, _ in lote])
+            if len(resultados) != len(lote):
+                raise RuntimeError("El OCR devolvió un número de resultados distinto al lote")
+        except asyncio.CancelledError:
+            for _, fut in lote:
+                if not fut.done():
+                    fut.set_exception(RuntimeError("Loteador OCR detenido"))
+            raise
+        except Exception as e:
+            for _, fut in lote:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        finally:
+            self._en_vuelo.release()
+
+        for (_, fut), res in zip(lote, resultados):
+            if not fut.done():
+                fut.set_result(extraer_candidatos(res))
@@ -0,0 +1,150 @@
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+class DetectorPlacas:
+    """Localiza placas con el detector YOLOv8 entrenado en EntrenamientoVal.ipynb (placas_v1).
+
+    Acepta el modelo exportado a ONNX (`yolo export ... format=onnx`) o a TFLite
+    (`format=tflite int8=True`) y lo ejecuta en CPU. Devuelve recortes de la
+    imagen original para que solo las placas pasen al reconocimiento.
+    """
+
+    def __init__(self, ruta_modelo: str, umbral: float = 0.25, tam_entrada: int = 640,
+                 margen: float = 0.1, max_placas: int = 3, cpu_threads: int = 2):
+        self.ruta_modelo = Path(ruta_modelo)
+        self.umbral = umbral
+        self.tam_entrada = tam_entrada
+        self.margen = margen
+        self.max_placas = max_placas
+        self._lock = None
+
+        if not self.ruta_modelo.exists():
+            raise FileNotFoundError(f"No existe el modelo del detector: {self.ruta_modelo}")
+
+        if self.ruta_modelo.suffix == ".onnx":
+            self._cargar_onnx(cpu_threads)
+        elif self.ruta_modelo.suffix == ".tflite":
+            self._cargar_tflite(cpu_threads)
+        else:
+            raise ValueError(f"Formato de detector no soportado: {self.ruta_modelo.suffix}")
+
+    def _cargar_onnx(self, cpu_threads: int):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("Se requiere onnxruntime para usar un detector .onnx") from e
+
+        opciones = ort.SessionOptions()
+        opciones.intra_op_num_threads = cpu_threads
+        opciones.inter_op_num_threads = 1
+        self._sesion = ort.InferenceSession(
+            str(self.ruta_modelo), sess_options=opciones, providers=["CPUExecutionProvider"]
+        )
+        self._nombre_entrada = self._sesion.get_inputs()[0].name
+        self._nhwc = False
+        self._inferir = self._inferir_onnx
+
+    def _cargar_tflite(self, cpu_threads: int):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tensorflow.lite import Interpreter
+            except ImportError as e:
+                raise RuntimeError("Se requiere tflite-runtime o tensorflow para usar un detector .tflite") from e
+
+        self._interprete = Interpreter(model_path=str(self.ruta_modelo), num_threads=cpu_threads)
+        self._interprete.allocate_tensors()
+        self._entrada = self._interprete.get_input_details()[0]
+        self._salida = self._interprete.get_output_details()[0]
+        self._nhwc = True
+        # El intérprete de TFLite no es seguro entre hilos.
+        self._lock = threading.Lock()
+        self._inferir = self._inferir_tflite
+
+    def _inferir_onnx(self, tensor: np.ndarray) -> np.ndarray:
+        return self._sesion.run(None, {self._nombre_entrada: tensor})[0]
+
+    def _inferir_tflite(self, tensor: np.ndarray) -> np.ndarray:
+        entrada, salida = self._entrada, self._salida
+        if entrada["dtype"] in (np.int8, np.uint8):
+            escala, cero = entrada["quantization"]
+            tensor = (tensor / escala + cero).astype(entrada["dtype"])
+
+        with self._lock:
+            self._interprete.set_tensor(entrada["index"], tensor)
+            self._interprete.invoke()
+            out = self._interprete.get_tensor(salida["index"])
+
+        if salida["dtype"] in (np.int8, np.uint8):
+            escala, cero = salida["quantization"]
+            out = (out.astype(np.float32) - cero) * escala
+        return out
+
+    def _letterbox(self, img: np.ndarray) -> tuple[np.ndarray, float, int, int]:
+        alto, ancho = img.shape[:2]
+        escala = self.tam_entrada / max(alto, ancho)
+        nuevo_ancho, nuevo_alto = round(ancho * escala), round(alto * escala)
+        redim = cv2.resize(img, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+
+        pad_x = (self.tam_entrada - nuevo_ancho) // 2
+        pad_y = (self.tam_entrada - nuevo_alto) // 2
+        lienzo = np.full((self.tam_entrada, self.tam_entrada, 3), 114, dtype=np.uint8)
+        lienzo[pad_y:pad_y + nuevo_alto, pad_x:pad_x + nuevo_ancho] = redim
+        return lienzo, escala, pad_x, pad_y
+
+    def detectar(self, img: np.ndarray) -> list[tuple[int, int, int, int, float]]:
+        """Devuelve cajas (x1, y1, x2, y2, score) en coordenadas de la imagen original"""
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+        lienzo, escala, pad_x, pad_y = self._letterbox(img)
+        tensor = cv2.cvtColor(lienzo, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        tensor = tensor[None] if self._nhwc else tensor.transpose(2, 0, 1)[None]
+
+        salida = self._inferir(np.ascontiguousarray(tensor))[0]
+        # YOLOv8: (4 + clases, N) -> (N, 4 + clases)
+        if salida.shape[0] < salida.shape[1]:
+            salida = salida.T
+
+        scores = salida[:, 4:].max(axis=1)
+        mascara = scores >= self.umbral
+        if not mascara.any():
+            return []
+
+        cajas = salida[mascara, :4].astype(np.float32)
+        scores = scores[mascara]
+        # La exportación a TFLite devuelve coordenadas normalizadas.
+        if cajas.max() <= 2.0:
+            cajas *= self.tam_entrada
+
+        cx, cy, w, h = cajas.T
+        xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), self.umbral, 0.45)
+        indices = np.array(indices).reshape(-1)[:self.max_placas]
+
+        alto, ancho = img.shape[:2]
+        detecciones = []
+        for i in indices:
+            x, y, w, h = xywh[i]
+            x1 = int(max(0, (x - pad_x) / escala))
+            y1 = int(max(0, (y - pad_y) / escala))
+            x2 = int(min(ancho, (x + w - pad_x) / escala))
+            y2 = int(min(alto, (y + h - pad_y) / escala))
+            if x2 > x1 and y2 > y1:
+                detecciones.append((x1, y1, x2, y2, float(scores[i])))
+        return detecciones
+
+    def recortar(self, img: np.ndarray) -> list[np.ndarray]:
+        """Recorta cada placa detectada con un margen alrededor para no cortar caracteres"""
+        alto, ancho = img.shape[:2]
+        recortes = []
+        for x1, y1, x2, y2, _ in self.detectar(img):
+            mx = int((x2 - x1) * self.margen)
+            my = int((y2 - y1) * self.margen)
+            recortes.append(img[max(0, y1 - my):min(alto, y2 + my), max(0, x1 - mx):min(ancho, x2 + mx)])
+        return recortes
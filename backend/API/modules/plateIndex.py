@@ -0,0 +1,143 @@
+import re
+import threading
+
+
+# Grupos de caracteres que el OCR confunde entre sí (disjuntos).
+_GRUPOS_CONFUSION = ["0OQD", "1IL", "8B", "5S", "2Z", "6G"]
+COSTO_CONFUSION = 0.3
+
+_GRUPO = {c: i for i, grupo in enumerate(_GRUPOS_CONFUSION) for c in grupo}
+_REPRESENTANTE = {c: grupo[0] for grupo in _GRUPOS_CONFUSION for c in grupo}
+_NO_ALFANUMERICO = re.compile(r"[^0-9A-Z]")
+
+
+def canonizar_placa(texto: str) -> str:
+    """Clave canónica de una placa: mayúsculas y sin guiones, espacios ni otros separadores"""
+    return _NO_ALFANUMERICO.sub("", texto.upper())
+
+
+def _costo_sustitucion(a: str, b: str) -> float:
+    if a == b:
+        return 0.0
+    grupo = _GRUPO.get(a)
+    if grupo is not None and grupo == _GRUPO.get(b):
+        return COSTO_CONFUSION
+    return 1.0
+
+
+def distancia_placas(a: str, b: str) -> float:
+    """Distancia de edición con sustituciones baratas entre caracteres que el OCR confunde"""
+    if a == b:
+        return 0.0
+    previa = [float(j) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        actual = [float(i)]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(
+                previa[j] + 1,
+                actual[j - 1] + 1,
+                previa[j - 1] + _costo_sustitucion(ca, cb),
+            ))
+        previa = actual
+    return round(previa[-1], 2)
+
+
+
+def _plegar(clave: str) -> str:
+    """Reemplaza cada carácter por el representante de su grupo de confusión"""
+    return "".join(_REPRESENTANTE.get(c, c) for c in clave)
+
+
+def _borrados(clave: str, profundidad: int) -> set[str]:
+    """La clave y todas sus variantes con hasta `profundidad` caracteres borrados"""
+    variantes = {clave}
+    frontera = {clave}
+    for _ in range(profundidad):
+        siguiente = set()
+        for v in frontera:
+            for i in range(len(v)):
+                siguiente.add(v[:i] + v[i + 1:])
+        variantes |= siguiente
+        frontera = siguiente
+    return variantes
+
+
+class IndicePlacas:
+    """Índice symmetric-delete en memoria con las placas registradas.
+
+    Las claves se guardan "plegadas" (0/O/D/Q, 1/I/L, 8/B, 5/S, 2/Z y 6/G valen lo
+    mismo), así las confusiones del OCR no cuentan como error, y junto con sus
+    variantes con hasta `profundidad` borrados. Una consulta solo revisa las placas
+    que comparten alguna variante y las ordena con `distancia_placas`.
+    """
+
+    def __init__(self, max_distancia: float = 1.5):
+        self.max_distancia = max_distancia
+        # Cada edición que no es confusión cuesta 1, así que bastan floor(max) borrados.
+        self.profundidad = int(max_distancia)
+        self._lock = threading.Lock()
+        self._placas: dict[str, str] = {}
+        self._variantes: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._placas)
+
+    def _indexar(self, clave: str):
+        for v in _borrados(_plegar(clave), self.profundidad):
+            self._variantes.setdefault(v, set()).add(clave)
+
+    def _desindexar(self, clave: str):
+        for v in _borrados(_plegar(clave), self.profundidad):
+            claves = self._variantes.get(v)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._variantes[v]
+
+    def reconstruir(self, placas):
+        with self._lock:
+            self._placas = {}
+            self._variantes = {}
+            for placa in placas:
+                clave = canonizar_placa(placa)
+                if clave:
+                    self._placas[clave] = placa
+                    self._indexar(clave)
+
+    def agregar(self, placa: str):
+        clave = canonizar_placa(placa)
+        if not clave:
+            return
+        with self._lock:
+            if clave not in self._placas:
+                self._indexar(clave)
+            self._placas[clave] = placa
+
+    def quitar(self, placa: str):
+        clave = canonizar_placa(placa)
+        with self._lock:
+            if self._placas.pop(clave, None) is not None:
+                self._desindexar(clave)
+
+    def buscar(self, texto: str, max_distancia: float | None = None, limite: int = 5) -> list[tuple[str, float]]:
+        """Placas registradas a distancia <= max_distancia, de la más cercana a la más lejana"""
+        clave = canonizar_placa(texto)
+        if not clave:
+            return []
+        if max_distancia is None or max_distancia > self.max_distancia:
+            max_distancia = self.max_distancia
+
+        with self._lock:
+            posibles: set[str] = set()
+            for v in _borrados(_plegar(clave), self.profundidad):
+                posibles |= self._variantes.get(v, set())
+            placas = {c: self._placas[c] for c in posibles}
+
+        encontradas = []
+        for c, placa in placas.items():
+            d = distancia_placas(clave, c)
+            if d <= max_distancia:
+                encontradas.append((placa, d))
+
+        encontradas.sort(key=lambda x: (x[1], x[0]))
+        return encontradas[:limite]
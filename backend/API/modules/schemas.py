@@ -1,4 +1,24 @@
-from pydantic import BaseModel, EmailStr
+from typing import Annotated
+
+from pydantic import AliasChoices, BaseModel, BeforeValidator, EmailStr, Field, model_validator
+
+from .config import REVIEW_BATCH_MAX
+from .imageStore import urls_imagenes
+
+
+def _por_defecto(valor):
+    """Validador que cambia None por `valor` (columnas viejas con nulos)"""
+    return BeforeValidator(lambda v: valor if v is None else v)
+
+
+Texto = Annotated[str, _por_defecto("")]
+Coordenada = Annotated[str, _por_defecto("0")]
+# `imagenes` se guarda como JSON con referencias al almacén; se responde con URLs.
+Imagenes = Annotated[list[str], BeforeValidator(lambda v: v if isinstance(v, list) else urls_imagenes(v))]
+Miniaturas = Annotated[
+    list[str], BeforeValidator(lambda v: v if isinstance(v, list) else urls_imagenes(v, miniatura=True))
+]
+
 
 class PersonaCreate(BaseModel):
     nombre: str
@@ -21,6 +41,30 @@ class PersonaRead(BaseModel):
     class Config:
         from_attributes = True
 
+
+class PersonaResumen(BaseModel):
+    id: int
+    nombre: str
+    edad: int
+    numeroControl: str
+    correo: str
+    estatus: str
+    noIncidencias: int
+
+    class Config:
+        from_attributes = True
+
+
+class ReportanteResumen(BaseModel):
+    id: int
+    nombre: str
+    numeroControl: str
+    correo: str
+
+    class Config:
+        from_attributes = True
+
+
 class AutoCreate(BaseModel):
     placa: str
     marca: str
@@ -28,40 +72,177 @@ class AutoCreate(BaseModel):
     color: str
 
 
-class AutoRead(BaseModel):
+class AutoResumen(BaseModel):
     id: int
     placa: str
     marca: str
     modelo: str
     color: str
-    personaId: int
 
     class Config:
         from_attributes = True
 
+
+class AutoRead(AutoResumen):
+    personaId: int = Field(validation_alias=AliasChoices("personaId", "persona_id"))
+
+
+class PersonaAutoRead(BaseModel):
+    persona: PersonaResumen
+    auto: AutoResumen | None = None
+
+
 class IncidenciaCreate(BaseModel):
     descripcion: str
     fecha: str
     hora: str | None = None
     imagenes: list[str]
-    estatus: str | None = None 
+    estatus: str | None = None
     latitud: str | None = None
     longitud: str | None = None
     personaId: int
     reportanteId: int
     autoId: int
+
+
 class IncidenciaRead(BaseModel):
     id: int
     descripcion: str
     fecha: str
     hora: str | None = None
-    imagenes: list[str] 
-    estatus: str | None = None 
-    latitud: str | None = None  
-    longitud: str | None = None   
-    personaId: int
-    reportanteId: int
-    autoId: int
+    imagenes: Imagenes
+    estatus: str | None = None
+    latitud: str | None = None
+    longitud: str | None = None
+    personaId: int = Field(validation_alias=AliasChoices("personaId", "persona_id"))
+    reportanteId: int = Field(validation_alias=AliasChoices("reportanteId", "reportante_id"))
+    autoId: int = Field(validation_alias=AliasChoices("autoId", "auto_id"))
 
     class Config:
         from_attributes = True
+
+
+class IncidenciaListItem(BaseModel):
+    """Incidencia en los listados: con miniaturas en lugar de las imágenes completas"""
+    id: int
+    descripcion: Texto
+    fecha: Texto
+    hora: Texto
+    imagenes: Miniaturas
+    estatus: Annotated[str, _por_defecto("Pendiente")]
+    latitud: Coordenada
+    longitud: Coordenada
+    persona_afectada: PersonaResumen | None = None
+    reportante: ReportanteResumen | None = None
+    auto: AutoResumen | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class IncidenciaDatos(BaseModel):
+    id: int
+    descripcion: str
+    fecha: str
+    hora: Texto
+    imagenes: Imagenes
+    miniaturas: Miniaturas = Field(validation_alias="imagenes")
+    estatus: str | None = None
+    latitud: Coordenada
+    longitud: Coordenada
+
+    class Config:
+        from_attributes = True
+
+
+class IncidenciaDetalle(BaseModel):
+    incidencia: IncidenciaDatos
+    persona_afectada: PersonaResumen | None = None
+    reportante: ReportanteResumen | None = None
+    auto: AutoResumen | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _desde_incidencia(cls, datos):
+        """Acepta directamente el modelo Incidencia (con sus relaciones cargadas)"""
+        if isinstance(datos, dict):
+            return datos
+        return {
+            "incidencia": datos,
+            "persona_afectada": datos.persona_afectada,
+            "reportante": datos.reportante,
+            "auto": datos.auto,
+        }
+
+
+class DecisionIncidencia(BaseModel):
+    id: int
+    estatus: str
+
+
+class RevisionIncidencias(BaseModel):
+    decisiones: list[DecisionIncidencia] = Field(min_length=1, max_length=REVIEW_BATCH_MAX)
+
+
+class PersonaEstatus(BaseModel):
+    id: int
+    nombre: str
+    noIncidencias: int
+    estatus: str
+
+    class Config:
+        from_attributes = True
+
+
+class EstatusIncidenciaResultado(BaseModel):
+    """Respuesta de PATCH /incidencias/{id}/estatus; persona y reportante solo si el estatus los involucra"""
+    message: str
+    incidencia_id: int
+    estatus: str
+    persona_afectada: PersonaEstatus | None = None
+    reportante: ReportanteResumen | None = None
+
+
+class RevisionResultado(BaseModel):
+    actualizadas: int
+    aprobadas: int
+    rechazadas: int
+    personas: list[PersonaEstatus]
+    correos: int
+
+
+class PersonaImportacion(PersonaCreate):
+    """Una persona del archivo de importación, con sus autos"""
+    autos: list[AutoCreate] = []
+
+
+class ErrorImportacion(BaseModel):
+    fila: int
+    error: str
+
+
+class ImportacionResultado(BaseModel):
+    filas: int
+    personas: int
+    autos: int
+    errores: list[ErrorImportacion]
+
+
+class LecturaOCR(BaseModel):
+    texto_crudo: str
+    score: float
+    placa_normalizada: str
+    perfil: str | None = None
+    cache: str | None = None
+
+
+class PlacaCercana(BaseModel):
+    placa: str
+    distancia: float
+
+
+class ResultadoOCR(BaseModel):
+    ocr: LecturaOCR
+    match_bd: PersonaAutoRead | None = None
+    coincidencias_cercanas: list[PlacaCercana] = []
+    tiempos_ms: dict[str, float] | None = None
@@ -0,0 +1,74 @@
+import time
+from collections import deque
+
+from .config import STREAM_COOLDOWN_S, STREAM_MIN_READINGS, STREAM_MIN_SHARE, STREAM_VOTE_WINDOW_S
+
+
+class VotacionPlacas:
+    """Votación temporal de lecturas de placa sobre los cuadros de una cámara.
+
+    Cada lectura vota con su score dentro de una ventana de `ventana_s`. Una
+    placa se considera estable cuando tiene al menos `min_lecturas` lecturas y
+    se lleva al menos `min_proporcion` del peso total de la ventana. Una placa ya
+    reportada no se vuelve a reportar hasta pasar `enfriamiento_s` sin leerla
+    (un auto detenido frente a la cámara genera un solo evento).
+    """
+
+    def __init__(self, ventana_s: float = STREAM_VOTE_WINDOW_S, min_lecturas: int = STREAM_MIN_READINGS,
+                 min_proporcion: float = STREAM_MIN_SHARE, enfriamiento_s: float = STREAM_COOLDOWN_S):
+        self.ventana = ventana_s
+        self.min_lecturas = min_lecturas
+        self.min_proporcion = min_proporcion
+        self.enfriamiento = enfriamiento_s
+        self._lecturas: deque[tuple[float, str, float]] = deque()
+        self._reportadas: dict[str, float] = {}
+
+    def _purgar(self, ahora: float):
+        while self._lecturas and self._lecturas[0][0] < ahora - self.ventana:
+            self._lecturas.popleft()
+        for placa, instante in list(self._reportadas.items()):
+            if instante < ahora - self.enfriamiento:
+                del self._reportadas[placa]
+
+    def refrescar(self, ahora: float | None = None):
+        """Un cuadro sin cambios respecto al último leído: mantiene vigente esa lectura sin sumar otra.
+
+        La lectura más reciente no sale de la ventana mientras la escena no cambie, y
+        si su placa ya se reportó sigue en enfriamiento; no cuenta como lectura nueva.
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        if self._lecturas:
+            _, placa, score = self._lecturas.pop()
+            self._lecturas.append((ahora, placa, score))
+            if placa in self._reportadas:
+                self._reportadas[placa] = ahora
+        self._purgar(ahora)
+
+    def agregar(self, placa: str, score: float, ahora: float | None = None) -> dict | None:
+        """Registra una lectura; devuelve el resultado de la votación si una placa quedó estable"""
+        ahora = time.monotonic() if ahora is None else ahora
+        self._purgar(ahora)
+        self._lecturas.append((ahora, placa, score))
+        if placa in self._reportadas:
+            self._reportadas[placa] = ahora
+
+        pesos: dict[str, float] = {}
+        conteos: dict[str, int] = {}
+        for _, p, s in self._lecturas:
+            pesos[p] = pesos.get(p, 0.0) + s
+            conteos[p] = conteos.get(p, 0) + 1
+
+        ganadora = max(pesos, key=pesos.get)
+        total = sum(pesos.values())
+        if ganadora in self._reportadas:
+            return None
+        if conteos[ganadora] < self.min_lecturas or pesos[ganadora] < total * self.min_proporcion:
+            return None
+
+        self._reportadas[ganadora] = ahora
+        return {
+            "placa": ganadora,
+            "lecturas": conteos[ganadora],
+            "score_promedio": pesos[ganadora] / conteos[ganadora],
+            "proporcion": pesos[ganadora] / total if total else 1.0,
+        }
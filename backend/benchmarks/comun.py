@@ -0,0 +1,27 @@
+"""Utilidades compartidas por los benchmarks"""
+import os
+
+# Los benchmarks no envían correos: con el transporte stub config.py no exige la llave de SendGrid.
+os.environ.setdefault("EMAIL_TRANSPORT", "stub")
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    bajo, alto = int(k), min(int(k) + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (k - bajo)
+
+
+def resumen(latencias_ms: list[float]) -> dict:
+    """p50/p95/p99 en ms y throughput de una serie de latencias"""
+    total = sum(latencias_ms)
+    return {
+        "p50_ms": round(percentil(latencias_ms, 50), 3),
+        "p95_ms": round(percentil(latencias_ms, 95), 3),
+        "p99_ms": round(percentil(latencias_ms, 99), 3),
+        "media_ms": round(total / len(latencias_ms), 3) if latencias_ms else 0.0,
+        "por_s": round(1000 * len(latencias_ms) / total, 2) if total else 0.0,
+        "muestras": len(latencias_ms),
+    }
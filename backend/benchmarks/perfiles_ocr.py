@@ -0,0 +1,114 @@
+"""Compara los perfiles de OCR en latencia, memoria y exactitud sobre un conjunto local de imágenes.
+
+El nombre de cada imagen (hasta el primer "_") es la placa esperada, p. ej.
+`ABC-123-A_1.jpg`; con `--sinteticas N` se usan N placas generadas por
+`benchmarks.placas_sinteticas`. Cada perfil corre en un proceso aparte para que la memoria
+pico de uno no se mezcle con la de otro. Para los perfiles `rec-only*` conviene
+usar recortes ajustados de la placa.
+
+    cd backend
+    python -m benchmarks.perfiles_ocr --imagenes ./muestras --perfiles mobile,server,rec-only
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .comun import percentil
+
+EXTENSIONES = {".jpg", ".jpeg", ".png"}
+
+
+def cargar_conjunto(directorio: Path) -> list[tuple[str, bytes]]:
+    from API.modules.plateIndex import canonizar_placa
+
+    conjunto = []
+    for ruta in sorted(directorio.iterdir()):
+        if ruta.suffix.lower() in EXTENSIONES:
+            conjunto.append((canonizar_placa(ruta.stem.split("_")[0]), ruta.read_bytes()))
+    return conjunto
+
+
+def medir_perfil(nombre: str, conjunto: list[tuple[str, bytes]], repeticiones: int, cpu_threads: int) -> dict:
+    from API.modules.imagePreprocess import preprocesar_imagen
+    from API.modules.ocrService import PERFILES_OCR, crear_motor_ocr, elegir_placa, extraer_candidatos
+    from API.modules.plateIndex import canonizar_placa
+
+    inicio = time.perf_counter()
+    motor = crear_motor_ocr(PERFILES_OCR[nombre], cpu_threads)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    imagenes = [(esperada, preprocesar_imagen(datos)[0]) for esperada, datos in conjunto]
+    motor.predict([imagenes[0][1]])
+
+    latencias, aciertos = [], 0
+    for _ in range(repeticiones):
+        for esperada, img in imagenes:
+            inicio = time.perf_counter()
+            candidatos = extraer_candidatos(motor.predict([img])[0])
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            try:
+                _, leida, _ = elegir_placa(candidatos)
+            except ValueError:
+                continue
+            aciertos += canonizar_placa(leida) == esperada
+
+    return {
+        "perfil": nombre,
+        "carga_ms": round(carga_ms, 1),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "imagenes_por_s": round(1000 * len(latencias) / sum(latencias), 2) if latencias else 0.0,
+        # ru_maxrss viene en KB en Linux.
+        "memoria_pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "exactitud": round(aciertos / len(latencias), 4) if latencias else 0.0,
+        "muestras": len(latencias),
+    }
+
+
+def main():
+    from API.modules.config import OCR_CPU_THREADS
+    from API.modules.ocrService import PERFILES_OCR
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--imagenes", type=Path, help="Directorio con las imágenes de prueba")
+    origen.add_argument("--sinteticas", type=int, help="Cantidad de placas sintéticas a generar")
+    parser.add_argument("--perfiles", default=",".join(PERFILES_OCR), help="Perfiles a comparar, separados por coma")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--cpu-threads", type=int, default=OCR_CPU_THREADS)
+    parser.add_argument("--json", type=Path, help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    if args.sinteticas:
+        from API.modules.plateIndex import canonizar_placa
+        from .placas_sinteticas import generar_conjunto
+
+        conjunto = [(canonizar_placa(texto), jpeg) for texto, jpeg in generar_conjunto(args.sinteticas)]
+    else:
+        conjunto = cargar_conjunto(args.imagenes)
+    if not conjunto:
+        parser.error(f"No hay imágenes en {args.imagenes}")
+
+    resultados = []
+    contexto = multiprocessing.get_context("spawn")
+    for nombre in [p.strip() for p in args.perfiles.split(",") if p.strip()]:
+        if nombre not in PERFILES_OCR:
+            parser.error(f"Perfil desconocido: {nombre}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            resultados.append(executor.submit(medir_perfil, nombre, conjunto, args.repeticiones, args.cpu_threads).result())
+
+    columnas = ["perfil", "carga_ms", "p50_ms", "p95_ms", "imagenes_por_s", "memoria_pico_mb", "exactitud"]
+    print("  ".join(f"{c:>16}" for c in columnas))
+    for r in resultados:
+        print("  ".join(f"{r[c]!s:>16}" for c in columnas))
+
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Mide por separado cada etapa del pipeline de /ocr/placa con placas sintéticas.
+
+Etapas: decodificación/preproceso, ida y vuelta por archivo temporal (el camino
+anterior, como referencia), `predict` del OCR, filtrado de candidatos y búsqueda
+en BD contra un SQLite local con autos sembrados. Reporta p50/p95/p99 e
+imágenes por segundo, puede guardar el resultado como línea base y comparar una
+corrida nueva contra ella (sale con código 1 si alguna etapa empeora más de la
+tolerancia).
+
+    cd backend
+    python -m benchmarks.pipeline_ocr --cantidad 200 --guardar base.json
+    python -m benchmarks.pipeline_ocr --cantidad 200 --comparar base.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .comun import resumen
+from .placas_sinteticas import generar_conjunto, placa_aleatoria
+
+
+def preparar_bd(placas: list[str], relleno: int, semilla: int):
+    """SQLite temporal con el esquema real, la mitad de las placas del conjunto y `relleno` autos más"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from API.modules.config import Base
+    from API.modules.models import Auto, Persona
+
+    ruta = Path(tempfile.mkdtemp()) / "bench.db"
+    engine = create_engine(f"sqlite:///{ruta}", future=True)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    rng = random.Random(semilla)
+    registradas = set(placas[::2])
+    while len(registradas) < len(placas[::2]) + relleno:
+        registradas.add(placa_aleatoria(rng))
+
+    with Session() as db:
+        for i, placa in enumerate(sorted(registradas)):
+            persona = Persona(nombre=f"Persona {i}", edad=20, numeroControl=f"NC{i:07d}", correo=f"p{i}@example.com")
+            persona.autos.append(Auto(placa=placa, marca="Marca", modelo="Modelo", color="Color"))
+            db.add(persona)
+        db.commit()
+    return Session
+
+
+def correr(args) -> dict:
+    from API.modules.imagePreprocess import preprocesar_imagen
+    from API.modules.mainAPI import consulta_placa, datos_placa
+    from API.modules.ocrService import PERFILES_OCR, crear_motor_ocr, elegir_placa, extraer_candidatos
+    from API.modules.plateIndex import canonizar_placa
+    from API.modules.config import OCR_CPU_THREADS, OCR_PROFILE
+
+    conjunto = generar_conjunto(args.cantidad, args.semilla)
+    Session = preparar_bd([texto for texto, _ in conjunto], args.relleno, args.semilla)
+
+    motor = None
+    perfil = args.perfil or OCR_PROFILE
+    if not args.sin_ocr:
+        motor = crear_motor_ocr(PERFILES_OCR[perfil], OCR_CPU_THREADS)
+        motor.predict([preprocesar_imagen(conjunto[0][1])[0]])
+
+    etapas: dict[str, list[float]] = {n: [] for n in ("decodificacion", "io_temporal", "ocr", "filtrado", "bd", "total")}
+    aciertos = 0
+
+    with Session() as db:
+        for texto, jpeg in conjunto:
+            inicio = time.perf_counter()
+            img, _ = preprocesar_imagen(jpeg)
+            decodificacion = (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
+                tmp.write(jpeg)
+            Path(tmp.name).read_bytes()
+            os.unlink(tmp.name)
+            etapas["io_temporal"].append((time.perf_counter() - inicio) * 1000)
+
+            ocr = 0.0
+            if motor is not None:
+                inicio = time.perf_counter()
+                candidatos = extraer_candidatos(motor.predict([img])[0])
+                ocr = (time.perf_counter() - inicio) * 1000
+                etapas["ocr"].append(ocr)
+            else:
+                # Sin OCR se filtra la placa verdadera con algo de ruido, para medir el resto del pipeline.
+                candidatos = [("MEXICO", 0.8), (texto, 0.93), ("0", 0.4)]
+
+            inicio = time.perf_counter()
+            try:
+                _, placa_norm, _ = elegir_placa(candidatos)
+            except ValueError:
+                placa_norm = ""
+            filtrado = (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            # Misma sentencia que la ruta async, ejecutada con la sesión síncrona del benchmark.
+            datos_placa(db.scalar(consulta_placa(canonizar_placa(placa_norm))))
+            bd = (time.perf_counter() - inicio) * 1000
+
+            etapas["decodificacion"].append(decodificacion)
+            etapas["filtrado"].append(filtrado)
+            etapas["bd"].append(bd)
+            etapas["total"].append(decodificacion + ocr + filtrado + bd)
+            aciertos += canonizar_placa(placa_norm) == canonizar_placa(texto)
+
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "maquina": platform.machine(),
+            "cpus": os.cpu_count(),
+            "cantidad": args.cantidad,
+            "semilla": args.semilla,
+            "relleno_bd": args.relleno,
+            "perfil": None if motor is None else perfil,
+        },
+        "etapas": {nombre: resumen(valores) for nombre, valores in etapas.items() if valores},
+        "exactitud": round(aciertos / len(conjunto), 4),
+    }
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> bool:
+    """Imprime la diferencia contra la línea base; False si alguna etapa empeoró más de la tolerancia"""
+    ok = True
+    print(f"\nContra línea base del {base['meta']['fecha']}:")
+    for etapa, valores in actual["etapas"].items():
+        previo = base["etapas"].get(etapa)
+        if not previo:
+            continue
+        for clave in ("p50_ms", "p95_ms"):
+            if not previo[clave]:
+                continue
+            cambio = (valores[clave] - previo[clave]) / previo[clave]
+            marca = ""
+            if cambio > tolerancia:
+                marca, ok = "  <-- REGRESIÓN", False
+            print(f"  {etapa:>16} {clave}: {previo[clave]:>10.3f} -> {valores[clave]:>10.3f} ({cambio:+.1%}){marca}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cantidad", type=int, default=100)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--relleno", type=int, default=5000, help="Autos extra en la BD de prueba")
+    parser.add_argument("--perfil", help="Perfil de OCR (por defecto OCR_PROFILE)")
+    parser.add_argument("--sin-ocr", action="store_true", help="Omite la inferencia; mide solo el resto del pipeline")
+    parser.add_argument("--guardar", type=Path, help="Escribe el resultado como línea base")
+    parser.add_argument("--comparar", type=Path, help="Línea base contra la cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Empeoramiento permitido (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    resultado = correr(args)
+
+    print(f"{'etapa':>16}  {'p50_ms':>10}  {'p95_ms':>10}  {'p99_ms':>10}  {'por_s':>10}")
+    for etapa, r in resultado["etapas"].items():
+        print(f"{etapa:>16}  {r['p50_ms']:>10.3f}  {r['p95_ms']:>10.3f}  {r['p99_ms']:>10.3f}  {r['por_s']:>10.2f}")
+    print(f"exactitud: {resultado['exactitud']:.2%}")
+
+    if args.guardar:
+        args.guardar.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    if args.comparar:
+        base = json.loads(args.comparar.read_text())
+        if not comparar(resultado, base, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Genera imágenes sintéticas de placas con formato mexicano para los benchmarks.
+
+Cada imagen es una placa dibujada con OpenCV (tipografía Hershey al azar),
+pegada con perspectiva sobre un fondo ruidoso y con desenfoque, ruido y brillo
+variables. Se puede usar como módulo o para escribir un directorio etiquetado
+(`<placa>_<n>.jpg`) que entiende `benchmarks.perfiles_ocr`:
+
+    cd backend
+    python -m benchmarks.placas_sinteticas --salida ./muestras --cantidad 200
+"""
+import argparse
+import random
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+LETRAS = "ABCDEFGHJKLMNPRSTUVWXYZ"
+DIGITOS = "0123456789"
+# L = letra, N = dígito. Formatos comunes de placas particulares y de carga.
+FORMATOS = ["LLL-NNN-L", "LLL-NN-NN", "NN-LL-NL", "LL-NN-NNN", "NNN-LLL"]
+FUENTES = [cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_TRIPLEX, cv2.FONT_HERSHEY_COMPLEX]
+
+
+def placa_aleatoria(rng: random.Random) -> str:
+    formato = rng.choice(FORMATOS)
+    return "".join(
+        rng.choice(LETRAS) if c == "L" else rng.choice(DIGITOS) if c == "N" else c
+        for c in formato
+    )
+
+
+def dibujar_placa(texto: str, rng: random.Random) -> np.ndarray:
+    """Placa frontal de 440x220 con marco, leyenda superior y la matrícula"""
+    placa = np.full((220, 440, 3), 245, dtype=np.uint8)
+    cv2.rectangle(placa, (6, 6), (433, 213), (40, 40, 40), 4)
+    cv2.putText(placa, "MEXICO", (170, 42), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (60, 60, 160), 2, cv2.LINE_AA)
+
+    fuente = rng.choice(FUENTES)
+    grosor = rng.randint(5, 8)
+    (ancho, alto), _ = cv2.getTextSize(texto, fuente, 1.0, grosor)
+    escala = min(400 / ancho, 90 / alto)
+    (ancho, alto), _ = cv2.getTextSize(texto, fuente, escala, grosor)
+    origen = ((440 - ancho) // 2, 130 + alto // 2)
+    cv2.putText(placa, texto, origen, fuente, escala, (20, 20, 20), grosor, cv2.LINE_AA)
+    return placa
+
+
+def escena(placa: np.ndarray, rng: random.Random, tam: tuple[int, int] = (1280, 720)) -> np.ndarray:
+    """Pega la placa con perspectiva sobre un fondo y aplica desenfoque, ruido y brillo"""
+    ancho, alto = tam
+    np_rng = np.random.default_rng(rng.randrange(2 ** 32))
+    fondo = np_rng.integers(40, 200, size=(alto // 8, ancho // 8, 3), dtype=np.uint8)
+    fondo = cv2.resize(fondo, (ancho, alto), interpolation=cv2.INTER_LINEAR)
+
+    escala = rng.uniform(0.6, 1.3)
+    w, h = placa.shape[1] * escala, placa.shape[0] * escala
+    x0 = rng.uniform(0, ancho - w)
+    y0 = rng.uniform(0, alto - h)
+    jitter = 0.12 * w
+    destino = np.float32([
+        [x0 + rng.uniform(-jitter, jitter), y0 + rng.uniform(-jitter, jitter)],
+        [x0 + w + rng.uniform(-jitter, jitter), y0 + rng.uniform(-jitter, jitter)],
+        [x0 + w + rng.uniform(-jitter, jitter), y0 + h + rng.uniform(-jitter, jitter)],
+        [x0 + rng.uniform(-jitter, jitter), y0 + h + rng.uniform(-jitter, jitter)],
+    ])
+    origen = np.float32([[0, 0], [placa.shape[1], 0], [placa.shape[1], placa.shape[0]], [0, placa.shape[0]]])
+    matriz = cv2.getPerspectiveTransform(origen, destino)
+    warp = cv2.warpPerspective(placa, matriz, (ancho, alto))
+    mascara = cv2.warpPerspective(np.full(placa.shape[:2], 255, np.uint8), matriz, (ancho, alto))
+    img = np.where(mascara[..., None] > 0, warp, fondo)
+
+    k = rng.choice([1, 3, 5])
+    if k > 1:
+        img = cv2.GaussianBlur(img, (k, k), 0)
+    ruido = np_rng.normal(0, rng.uniform(2, 12), img.shape)
+    brillo = rng.uniform(-40, 30)
+    return np.clip(img.astype(np.float32) + ruido + brillo, 0, 255).astype(np.uint8)
+
+
+def generar_conjunto(cantidad: int, semilla: int = 0, calidad: int = 90,
+                     tam: tuple[int, int] = (1280, 720)) -> list[tuple[str, bytes]]:
+    """Lista reproducible de (placa, JPEG) sintéticos"""
+    rng = random.Random(semilla)
+    conjunto = []
+    for _ in range(cantidad):
+        texto = placa_aleatoria(rng)
+        ok, jpeg = cv2.imencode(".jpg", escena(dibujar_placa(texto, rng), rng, tam), [cv2.IMWRITE_JPEG_QUALITY, calidad])
+        if not ok:
+            raise RuntimeError("No se pudo codificar la imagen sintética")
+        conjunto.append((texto, jpeg.tobytes()))
+    return conjunto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salida", type=Path, required=True)
+    parser.add_argument("--cantidad", type=int, default=100)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    args.salida.mkdir(parents=True, exist_ok=True)
+    for i, (texto, jpeg) in enumerate(generar_conjunto(args.cantidad, args.semilla)):
+        (args.salida / f"{texto}_{i:04d}.jpg").write_bytes(jpeg)
+    print(f"{args.cantidad} imágenes escritas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
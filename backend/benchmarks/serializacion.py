@@ -0,0 +1,171 @@
+"""Compara la serialización de los listados: dicts armados a mano contra los esquemas de respuesta.
+
+"anterior" reproduce lo que hacían las rutas antes de `schemas.py`: un dict por
+fila, `jsonable_encoder` y `json.dumps` de `JSONResponse`. "esquemas" es el
+camino actual de FastAPI (>= 0.130) con `response_model`: Pydantic valida desde
+los atributos del modelo y escribe el JSON directo a bytes. Si orjson está
+instalado se mide también "orjson", lo que haría `ORJSONResponse` como clase por
+defecto con los mismos esquemas (Pydantic a objetos de Python y luego
+orjson.dumps). No usa BD: los modelos se arman en memoria.
+
+    cd backend
+    python -m benchmarks.serializacion --filas 5000
+"""
+import argparse
+import json
+import random
+import time
+
+from .comun import resumen
+from .placas_sinteticas import placa_aleatoria
+
+
+def generar_incidencias(filas: int, semilla: int):
+    from API.modules.models import Auto, Incidencia, Persona
+
+    rng = random.Random(semilla)
+    personas = [
+        Persona(id=i, nombre=f"Persona {i}", edad=20 + i % 40, numeroControl=f"NC{i:07d}",
+                correo=f"p{i}@example.com", estatus="Autorizado", noIncidencias=i % 3)
+        for i in range(max(2, filas // 10))
+    ]
+    autos = [
+        Auto(id=i, placa=placa_aleatoria(rng), marca="Marca", modelo="Modelo", color="Color", persona_id=p.id)
+        for i, p in enumerate(personas)
+    ]
+    incidencias = []
+    for i in range(filas):
+        afectada, reportante = rng.sample(personas, 2)
+        incidencias.append(Incidencia(
+            id=i, descripcion=f"Incidencia {i}", fecha="2025-01-01", hora="12:00:00",
+            imagenes=json.dumps([f"{rng.getrandbits(256):064x}" for _ in range(rng.randint(0, 3))]),
+            estatus=rng.choice(["Pendiente", "Aprobada", "Rechazada"]), latitud="21.1", longitud="-101.6",
+            persona_afectada=afectada, reportante=reportante, auto=autos[afectada.id],
+        ))
+    return personas, autos, incidencias
+
+
+def dicts_incidencias(incidencias) -> list[dict]:
+    """Copia del dict que armaba `listar_incidencias` antes de los esquemas"""
+    return [
+        {
+            "id": inc.id,
+            "descripcion": inc.descripcion or "",
+            "fecha": inc.fecha or "",
+            "hora": inc.hora or "",
+            "imagenes": json.loads(inc.imagenes) if inc.imagenes else [],
+            "estatus": inc.estatus or "Pendiente",
+            "latitud": inc.latitud or "0",
+            "longitud": inc.longitud or "0",
+            "persona_afectada": {
+                "id": inc.persona_afectada.id,
+                "nombre": inc.persona_afectada.nombre or "",
+                "numeroControl": inc.persona_afectada.numeroControl or "",
+                "correo": inc.persona_afectada.correo or "",
+                "estatus": inc.persona_afectada.estatus or "Autorizado",
+                "noIncidencias": inc.persona_afectada.noIncidencias or 0
+            } if inc.persona_afectada else None,
+            "reportante": {
+                "id": inc.reportante.id,
+                "nombre": inc.reportante.nombre or "",
+                "numeroControl": inc.reportante.numeroControl or "",
+                "correo": inc.reportante.correo or ""
+            } if inc.reportante else None,
+            "auto": {
+                "id": inc.auto.id,
+                "placa": inc.auto.placa or "",
+                "marca": inc.auto.marca or "",
+                "modelo": inc.auto.modelo or "",
+                "color": inc.auto.color or ""
+            } if inc.auto else None
+        }
+        for inc in incidencias
+    ]
+
+
+def dicts_personas(personas) -> list[dict]:
+    return [
+        {
+            "id": p.id,
+            "nombre": p.nombre,
+            "edad": p.edad,
+            "numeroControl": p.numeroControl,
+            "correo": p.correo,
+            "estatus": p.estatus,
+            "noIncidencias": p.noIncidencias,
+        }
+        for p in personas
+    ]
+
+
+def dicts_autos(autos) -> list[dict]:
+    return [
+        {
+            "id": a.id,
+            "placa": a.placa,
+            "marca": a.marca,
+            "modelo": a.modelo,
+            "color": a.color,
+            "personaId": a.persona_id,
+        }
+        for a in autos
+    ]
+
+
+def medir(funcion, repeticiones: int) -> tuple[dict, int]:
+    funcion()
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return resumen(latencias), len(cuerpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=5000, help="Incidencias del listado (personas y autos: filas/10)")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from API.modules.schemas import AutoRead, IncidenciaListItem, PersonaResumen
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    personas, autos, incidencias = generar_incidencias(args.filas, args.semilla)
+    listados = [
+        ("incidencias", incidencias, dicts_incidencias, IncidenciaListItem),
+        ("personas", personas, dicts_personas, PersonaResumen),
+        ("autos", autos, dicts_autos, AutoRead),
+    ]
+
+    print(f"{'listado':>12} {'camino':>10} {'p50_ms':>10} {'p95_ms':>10} {'bytes':>10}")
+    for nombre, filas, a_dicts, esquema in listados:
+        adaptador = TypeAdapter(list[esquema])
+        caminos = {
+            "anterior": lambda: JSONResponse(jsonable_encoder(a_dicts(filas))).body,
+            "esquemas": lambda: adaptador.dump_json(adaptador.validate_python(filas, from_attributes=True)),
+        }
+        if orjson is not None:
+            caminos["orjson"] = lambda: orjson.dumps(
+                adaptador.dump_python(adaptador.validate_python(filas, from_attributes=True), mode="json")
+            )
+
+        base = None
+        for camino, funcion in caminos.items():
+            r, tam = medir(funcion, args.repeticiones)
+            base = base or r["p50_ms"]
+            print(f"{nombre:>12} {camino:>10} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {tam:>10}"
+                  f"  x{base / r['p50_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -263,7 +263,7 @@ Future<void> _obtenerUbicacion() async {
     final descripcion = _descripcionCtrl.text.trim();
     final fecha = DateFormat('yyyy-MM-dd').format(DateTime.now());
     final hora = DateFormat('HH:mm:ss').format(DateTime.now());
-    final imagenes = _imagenesCapturadas.map((img) => img.path).toList();
+    final imagenes = await api.subirImagenes(_imagenesCapturadas);
 
     await api.crearIncidencia(
       descripcion: descripcion,
@@ -1,4 +1,3 @@
-import 'dart:io';
 import 'package:flutter/material.dart';
 import '../models/incidence_model.dart';
 import '../services/api_client.dart';
@@ -349,10 +348,8 @@ class _IncidenciaDetailPageState extends State<IncidenciaDetailPage> {
                         padding: const EdgeInsets.symmetric(vertical: 8.0),
                         child: ClipRRect(
                           borderRadius: BorderRadius.circular(8),
-                          child: Image.file(
-                            File(
-                              imgUrl,
-                            ),
+                          child: Image.network(
+                            ApiClient.instance.urlImagen(imgUrl),
                             fit: BoxFit.cover,
                             errorBuilder: (context, error, stackTrace) {
                               return Container(
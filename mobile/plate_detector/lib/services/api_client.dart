@@ -54,6 +54,35 @@ class ApiClient {
     );
   }
 
+  /// Recorre las páginas de un listado siguiendo el encabezado X-Next-After-Id.
+  Future<List<dynamic>> _obtenerPaginado(
+    String ruta,
+    String descripcion, [
+    Map<String, String> filtros = const {},
+  ]) async {
+    final items = <dynamic>[];
+    String? afterId;
+
+    do {
+      final uri = Uri.parse('$_baseUrl$ruta').replace(
+        queryParameters: {
+          ...filtros,
+          if (afterId != null) 'after_id': afterId,
+        },
+      );
+      final response = await http.get(uri);
+
+      if (response.statusCode != 200) {
+        throw Exception('Error al obtener $descripcion: ${response.statusCode}');
+      }
+
+      items.addAll(jsonDecode(response.body) as List<dynamic>);
+      afterId = response.headers['x-next-after-id'];
+    } while (afterId != null);
+
+    return items;
+  }
+
   // ======= Rutas de Personas =======
   Future<PlateData> obtenerDetallePersona(int personaId) async {
     final uri = Uri.parse('$_baseUrl/personas/$personaId/detalle');
@@ -70,14 +99,7 @@ class ApiClient {
   }
 
   Future<List<Persona>> obtenerUsuarios() async {
-    final uri = Uri.parse('$_baseUrl/personas');
-    final response = await http.get(uri);
-
-    if (response.statusCode != 200) {
-      throw Exception('Error al obtener usuarios: ${response.statusCode}');
-    }
-
-    final data = jsonDecode(response.body) as List<dynamic>;
+    final data = await _obtenerPaginado('/personas', 'usuarios');
     return data
         .map((item) => Persona.fromJson(item as Map<String, dynamic>))
         .toList();
@@ -191,14 +213,7 @@ Future<Persona?> login(String numeroControl) async {
   }
 
   Future<List<Auto>> obtenerAutos() async {
-    final uri = Uri.parse('$_baseUrl/autos');
-    final response = await http.get(uri);
-
-    if (response.statusCode != 200) {
-      throw Exception('Error al obtener autos: ${response.statusCode}');
-    }
-
-    final data = jsonDecode(response.body) as List<dynamic>;
+    final data = await _obtenerPaginado('/autos', 'autos');
     return data
         .map((item) => Auto.fromJson(item as Map<String, dynamic>))
         .toList();
@@ -233,16 +248,12 @@ Future<Persona?> login(String numeroControl) async {
   // ======= Rutas de Incidencias =======
 
   Future<List<IncidenciaListItem>> obtenerIncidencias(int personaId) async {
-  final uri = Uri.parse('$_baseUrl/incidencias?personaId=$personaId');
-  
-  final response = await http.get(uri);
-
-  if (response.statusCode != 200) {
-    throw Exception('Error al obtener incidencias: ${response.statusCode}');
-  }
-
   try {
-    final data = jsonDecode(response.body) as List<dynamic>;
+    final data = await _obtenerPaginado(
+      '/incidencias',
+      'incidencias',
+      {'personaId': '$personaId'},
+    );
     
     final items = data.map((item) {
       return IncidenciaListItem.fromJson(item as Map<String, dynamic>);
@@ -268,6 +279,30 @@ Future<Persona?> login(String numeroControl) async {
     return IncidenciaDetalle.fromJson(json);
   }
 
+  /// Sube las fotos de evidencia y devuelve sus referencias para `crearIncidencia`.
+  Future<List<String>> subirImagenes(List<File> imagenes) async {
+    if (imagenes.isEmpty) return [];
+
+    final uri = Uri.parse('$_baseUrl/imagenes');
+    final request = http.MultipartRequest('POST', uri);
+    for (final imagen in imagenes) {
+      request.files.add(await http.MultipartFile.fromPath('files', imagen.path));
+    }
+
+    final streamedResponse = await request.send();
+    final response = await http.Response.fromStream(streamedResponse);
+
+    if (response.statusCode != 201) {
+      throw Exception('Error al subir imágenes: ${response.statusCode}');
+    }
+
+    final data = jsonDecode(response.body) as List<dynamic>;
+    return data.map((e) => (e as Map<String, dynamic>)['id'] as String).toList();
+  }
+
+  /// URL absoluta de una imagen devuelta por la API (que las manda relativas).
+  String urlImagen(String ruta) => ruta.startsWith('/') ? '$_baseUrl$ruta' : ruta;
+
   Future<Incidencia> crearIncidencia({
     required String descripcion,
     required String fecha,